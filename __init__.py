@@ -1,6 +1,20 @@
 from .album_functions import get_track_audio_features, get_albums, get_album_tracks, get_artist_albums, get_album_summary, get_album_track_features
-from .artist_functions import get_artists, get_artist_projects, get_related_artists, get_album_tracks, get_track_audio_features, get_artist_audio_features, get_artists_summary, get_artist_summary, get_artist_top_tracks, 
-from .authorize import get_spotify_access_token, search_spotify
+from .album_functions import iter_track_audio_features, iter_albums, iter_album_tracks, iter_artist_albums
+from .artist_functions import get_artists, get_artist_projects, get_related_artists, get_album_tracks, get_track_audio_features, get_artist_audio_features, get_artists_audio_features, get_artists_summary, get_artist_summary, get_artist_top_tracks
+from .artist_functions import iter_artists, iter_artist_projects
+from .sync import CatalogStore, sync_artist_audio_features, sync_artists_audio_features
+from .crawl import CrawlStore, crawl_related_artists
+from .feature_index import FeatureIndex
+from .stats import RunningStats
+from .compact import compact_frame, memory_report
+from .authorize import get_spotify_access_token, search_spotify, TokenProvider
+from .search import search, SearchResult, SearchCache, get_search_cache, set_search_cache
+from .transport import get_session, set_session, get_urls, get_timeout, set_timeout, SpotifyAPIError
+from .cache import ResponseCache, get_cache, set_cache
+from .entity_store import EntityStore, get_entity_store, set_entity_store
+from .concurrency import get_max_workers, set_max_workers
+from .scheduler import RequestScheduler, get_scheduler, set_scheduler
+from .hooks import add_hook, remove_hook, clear_hooks, EndpointHistogram, LoggingSink, RequestEvent
 
 __all__ = [
     'get_track_audio_features', 
@@ -13,9 +27,65 @@ __all__ = [
     'get_artist_projects', 
     'get_related_artists', 
     'get_artist_audio_features', 
+    'get_artists_audio_features',
     'get_artists_summary', 
     'get_artist_summary', 
     'get_artist_top_tracks', 
+    'iter_track_audio_features',
+    'iter_albums',
+    'iter_album_tracks',
+    'iter_artist_albums',
+    'iter_artists',
+    'iter_artist_projects',
+    'CatalogStore',
+    'sync_artist_audio_features',
+    'sync_artists_audio_features',
+    'CrawlStore',
+    'crawl_related_artists',
+    'FeatureIndex',
+    'RunningStats',
+    'compact_frame',
+    'memory_report',
+    'ShardedJob',
+    'run_job',
     'get_spotify_access_token', 
-    'search_spotify'
+    'search_spotify',
+    'TokenProvider',
+    'search',
+    'SearchResult',
+    'SearchCache',
+    'get_search_cache',
+    'set_search_cache',
+    'get_session',
+    'set_session',
+    'get_urls',
+    'get_timeout',
+    'set_timeout',
+    'SpotifyAPIError',
+    'RequestScheduler',
+    'get_scheduler',
+    'set_scheduler',
+    'add_hook',
+    'remove_hook',
+    'clear_hooks',
+    'EndpointHistogram',
+    'LoggingSink',
+    'RequestEvent',
+    'get_max_workers',
+    'set_max_workers',
+    'ResponseCache',
+    'get_cache',
+    'set_cache',
+    'EntityStore',
+    'get_entity_store',
+    'set_entity_store'
 ]
+
+
+def __getattr__(name):
+    # jobs is imported on first use, so `python -m spotipy_gato365.jobs` does not find
+    # the module already loaded by the package
+    if name in ('ShardedJob', 'run_job'):
+        from . import jobs
+        return getattr(jobs, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
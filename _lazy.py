@@ -0,0 +1,13 @@
+import importlib
+
+
+class LazyModule:
+    # Stand-in for a heavy module that is only imported on first attribute access
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
@@ -0,0 +1,308 @@
+import asyncio
+import json
+
+from .album_functions import _album_tracks_frame, _albums_frame, _track_features_frame
+from .artist_functions import _artist_audio_features_frame, _artists_frame, _projects_frame, _related_artists_frame, _top_tracks_frame
+from .compact import compact_frame
+from .concurrency import chunked
+from .constants import MAX_ALBUM_IDS, MAX_ARTIST_IDS, MAX_AUDIO_FEATURE_IDS, PAGE_SIZE
+from .entity_store import fetch_missing_async
+from .scheduler import get_scheduler
+from .search import _matched_items, _Resolution
+from .hooks import observe_async
+from .transport import API_URL, SpotifyAPIError, _CachedGet, get_timeout, resolve_token
+
+# Async counterparts of the public functions, for callers already running an event loop.
+# Requests share one aiohttp session whose connection count is capped at `limit`, and go
+# through the same RequestScheduler (rate limit, retries, counters) and response cache
+# as the blocking API.
+
+DEFAULT_LIMIT = 16
+
+_client = None
+_client_loop = None
+_semaphore = None
+_base_url = API_URL
+_limit = DEFAULT_LIMIT
+
+
+def _aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("spotipy_gato365.aio requires aiohttp; install it with `pip install aiohttp`") from None
+    return aiohttp
+
+
+def get_client():
+    # The session and semaphore belong to the loop they were created on, so a new
+    # event loop (e.g. a second asyncio.run) gets its own
+    global _client, _client_loop, _semaphore
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.closed or _client_loop is not loop:
+        aiohttp = _aiohttp()
+        _client = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=_limit))
+        _client_loop = loop
+        _semaphore = asyncio.Semaphore(_limit)
+    return _client
+
+
+def set_client(client=None, base_url=None, limit=None):
+    # Use a caller-owned aiohttp.ClientSession and/or another base URL or connection limit
+    global _client, _client_loop, _semaphore, _base_url, _limit
+    _limit = limit or _limit
+    _client = client
+    _client_loop = asyncio.get_running_loop() if client is not None else None
+    _semaphore = asyncio.Semaphore(_limit) if client is not None else None
+    _base_url = (base_url or API_URL).rstrip('/')
+
+
+async def close():
+    global _client
+    if _client is not None and not _client.closed:
+        await _client.close()
+    _client = None
+
+
+def _url(path):
+    if path.startswith(API_URL):
+        path = path[len(API_URL):]
+    elif path.startswith('http://') or path.startswith('https://'):
+        return path
+    return _base_url + path
+
+
+def _client_timeout(aiohttp):
+    # The blocking API's (connect, read) timeout; a read timeout bounds each wait for data
+    timeout = get_timeout()
+    if timeout is None:
+        return aiohttp.ClientTimeout(total=None)
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+
+class _Response:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+async def _bearer(access_token, etag=None):
+    if hasattr(access_token, 'get_token'):
+        if access_token.needs_refresh():
+            # Refreshing is a blocking POST; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            access_token = await loop.run_in_executor(None, access_token.get_token)
+        else:
+            access_token = access_token.get_token()
+    headers = {'Authorization': f'Bearer {access_token}'}
+    if etag:
+        headers['If-None-Match'] = etag
+    return headers
+
+
+async def api_get(path, access_token, params=None, error="Request failed"):
+    aiohttp = _aiohttp()
+    client = get_client()
+    semaphore = _semaphore
+    access_token = resolve_token(access_token)
+    url = _url(path)
+    get = _CachedGet(url, _base_url, path, params, error)
+    if get.hit:
+        return get.entry.data
+
+    async def request():
+        headers = await _bearer(access_token, get.etag)
+        async with semaphore:
+            async with client.get(url, headers=headers, params=params, timeout=_client_timeout(aiohttp)) as response:
+                return _Response(response.status, response.headers, await response.read())
+
+    scheduler = get_scheduler()
+    retry_on = (aiohttp.ClientError, asyncio.TimeoutError)
+    response = await scheduler.send_async(observe_async(request, 'GET', get.endpoint, url, params, get.state), get.endpoint, retry_on=retry_on)
+    if get.retry(response, access_token):
+        response = await scheduler.send_async(observe_async(request, 'GET', get.endpoint, url, params, get.state), get.endpoint, retry_on=retry_on)
+    return get.result(response)
+
+
+async def follow_pages(page, access_token, limit=None, error="Request failed"):
+    # Items of a paging object and of every page its `next` links lead to, up to `limit`
+    items = []
+    while page is not None:
+        items.extend(page.get('items', []))
+        if limit is not None and len(items) >= limit:
+            return items[:limit]
+        if not page.get('next'):
+            break
+        page = await api_get(page['next'], access_token, error=error)
+    return items
+
+
+async def paginate(path, access_token, params=None, page_size=PAGE_SIZE, limit=None, error="Request failed"):
+    params = dict(params or {})
+    params['limit'] = min(page_size, limit) if limit else page_size
+    page = await api_get(path, access_token, params=params, error=error)
+    return await follow_pages(page, access_token, limit=limit, error=error)
+
+
+async def search(queries, search_type, access_token=None, limit=1, market=None):
+    resolution = _Resolution(queries, search_type, limit, market)
+
+    async def fetch(query):
+        try:
+            return query, await api_get('/search', access_token, params=resolution.params(query), error=f"Failed to search for {resolution.spelling[query]}"), None
+        except SpotifyAPIError as e:
+            return query, None, str(e)
+
+    for batch in resolution.batches():
+        resolution.store(await asyncio.gather(*(fetch(query) for query in resolution.missing(batch))))
+    return resolution.results()
+
+
+async def search_spotify(queries, search_type, access_token=None, limit=1, market=None):
+    return _matched_items(await search(queries, search_type, access_token, limit, market))
+
+
+async def _gather_chunks(fetch, ids, size):
+    # Runs fetch on every chunk concurrently and flattens the results in input order
+    results = await asyncio.gather(*(fetch(chunk) for chunk in chunked(ids, size)))
+    return [item for items in results for item in items]
+
+
+async def _fetch_audio_features(ids, access_token):
+    async def fetch(chunk):
+        response = await api_get('/audio-features', access_token, params={'ids': ','.join(chunk)}, error="Failed to get track audio features")
+        return response['audio_features']
+    async def fetch_all(ids):
+        return await _gather_chunks(fetch, ids, MAX_AUDIO_FEATURE_IDS)
+    return await fetch_missing_async('audio_features', ids, fetch_all)
+
+
+async def _fetch_albums(ids, access_token):
+    async def fetch(chunk):
+        response = await api_get('/albums', access_token, params={'ids': ','.join(chunk), 'market': 'US'}, error="Failed to get album info")
+        return response['albums']
+    async def fetch_all(ids):
+        if len(ids) == 1:
+            return [await api_get('/albums/' + ids[0], access_token, params={'market': 'US'}, error="Failed to get album info")]
+        return await _gather_chunks(fetch, ids, MAX_ALBUM_IDS)
+    return await fetch_missing_async('albums', ids, fetch_all)
+
+
+async def _fetch_artists(ids, access_token):
+    async def fetch(chunk):
+        response = await api_get('/artists', access_token, params={'ids': ','.join(chunk)}, error="Failed to get artist info")
+        return response['artists']
+    async def fetch_all(ids):
+        if len(ids) == 1:
+            return [await api_get('/artists/' + ids[0], access_token, error="Failed to get artist info")]
+        return await _gather_chunks(fetch, ids, MAX_ARTIST_IDS)
+    return await fetch_missing_async('artists', ids, fetch_all)
+
+
+async def get_track_audio_features(queries=None, ids=None, access_token=None, compact=False):
+    if queries is not None:
+        search_results = await search_spotify(queries, "track", access_token=access_token)
+        ids = [track['id'] for track in search_results]
+    if not ids:
+        raise ValueError("No track ids provided or found.")
+    result = _track_features_frame(await _fetch_audio_features(ids, access_token))
+    return compact_frame(result) if compact else result
+
+
+async def get_albums(queries=None, ids=None, access_token=None):
+    if queries is not None:
+        search_results = await search_spotify(queries, "album", access_token)
+        ids = [album['id'] for album in search_results]
+    if not ids:
+        raise ValueError("No album ids provided or found.")
+    return _albums_frame(await _fetch_albums(ids, access_token))
+
+
+async def get_album_tracks(query=None, ids=None, access_token=None, limit=None, offset=0):
+    if query is not None:
+        ids = [album['id'] for album in await search_spotify([query], "album", access_token, market='US')]
+    if not ids:
+        raise ValueError("No album ids provided or found.")
+    if len(ids) == 1:
+        params = {'market': 'US', 'offset': offset}
+        tracks_data = await paginate(f"/albums/{ids[0]}/tracks", access_token, params=params, limit=limit, error="Failed to get album tracks info")
+        return _album_tracks_frame(tracks_data, ids[0])
+    # Unknown ids come back as null and are skipped
+    albums = [album for album in await _fetch_albums(ids, access_token) if album]
+    album_tracks = await asyncio.gather(*(follow_pages(album['tracks'], access_token, error="Failed to get album tracks info") for album in albums))
+    return _album_tracks_frame(
+        [track for tracks in album_tracks for track in tracks],
+        [album['id'] for album, tracks in zip(albums, album_tracks) for track in tracks]
+    )
+
+
+async def get_artists(queries=None, ids=None, access_token=None):
+    if queries is not None:
+        search_results = await search_spotify(queries, "artist", access_token)
+        ids = [artist['id'] for artist in search_results]
+    if not ids:
+        raise ValueError("No artist ids provided or found.")
+    return _artists_frame(await _fetch_artists(ids, access_token))
+
+
+async def get_artist_projects(query=None, id=None, access_token=None, limit=None, offset=0):
+    if query:
+        search_results = await search_spotify([query], "artist", access_token)
+        id = search_results[0]['id'] if search_results else None
+    if not id:
+        raise ValueError("Artist ID must be provided or found through a search query.")
+    params = {'include_groups': 'album,single', 'market': 'US', 'offset': offset}
+    albums = await paginate(f'/artists/{id}/albums', access_token, params=params, limit=limit, error="Failed to fetch albums")
+    return _projects_frame(albums)
+
+
+async def get_related_artists(query=None, id=None, access_token=None):
+    if query:
+        search_results = await search_spotify([query], "artist", access_token)
+        if not search_results:
+            raise ValueError(f"No artist found for query: {query}")
+        id = search_results[0]['id']
+    if not id:
+        raise ValueError("Artist ID must be provided or found through a search query.")
+    response = await api_get(f"/artists/{id}/related-artists", access_token, error="Failed to fetch related artists")
+    return _related_artists_frame(response['artists'])
+
+
+async def get_artist_top_tracks(query=None, id=None, access_token=None):
+    if query:
+        search_results = await search_spotify([query], "artist", access_token)
+        if not search_results:
+            raise ValueError(f"No artist found for query: {query}")
+        id = search_results[0]['id']
+    if not id:
+        raise ValueError("Artist ID must be provided or found through a search query.")
+    response = await api_get(f"/artists/{id}/top-tracks", access_token, params={'market': 'US'}, error="Failed to fetch top tracks")
+    return _top_tracks_frame(response['tracks'])
+
+
+async def get_artist_audio_features(query=None, id=None, access_token=None, compact=False):
+    info = await get_artists(queries=[query] if query else None, ids=[id] if id else None, access_token=access_token)
+    if info.empty:
+        raise ValueError("No artist found with the inputted ID. Please try again with a different ID.")
+
+    artist_id = info['artist_id'].iloc[0]
+    artist_name = info['artist_name'].iloc[0]
+
+    albums = await get_artist_projects(id=artist_id, access_token=access_token)
+    if albums.empty:
+        raise ValueError("No albums found with the inputted ID. Please try again with a different ID.")
+
+    tracks = await get_album_tracks(ids=albums['album_id'].tolist(), access_token=access_token)
+    track_audio_features = await get_track_audio_features(ids=tracks['track_id'].tolist(), access_token=access_token)
+
+    result = _artist_audio_features_frame(albums, tracks, track_audio_features, artist_name, artist_id)
+    return compact_frame(result) if compact else result
@@ -1,176 +1,148 @@
-import os
-import requests
-from authorize import get_spotify_access_token
-from authorize import search_spotify
+from .authorize import search_spotify
+from .search import search_items
+from .transport import api_get, follow_pages, paginate
+from .concurrency import chunked, iter_chunked, iter_map
+from .entity_store import fetch_missing
+from .constants import MAX_ALBUM_IDS, MAX_AUDIO_FEATURE_IDS
+from .stats import RunningStats
+from .compact import compact_frame
+from .records import (AlbumRecord, ArtistAlbumRecord, FeatureRecord, TrackRecord, album_records, artist_album_record,
+                      feature_record, records_frame, track_record)
+from ._lazy import LazyModule
 
-import pandas as pd
+pd = LazyModule('pandas')
 
 
-def get_track_audio_features(queries=None, ids=None, access_token=None):
-    if ids and len(ids) > 100:
-        raise ValueError("The maximum length of the ids vector is 100. Please shorten the length of the input vector.")
-    
+# Each get_* function below has an iter_* twin that yields one record (a namedtuple from
+# records.py) per row as pages arrive, so rows can be streamed to disk without ever
+# building the full DataFrame.
+
+def get_track_audio_features(queries=None, ids=None, access_token=None, max_workers=None, compact=False):
+    result = records_frame(iter_track_audio_features(queries, ids, access_token, max_workers), FeatureRecord)
+    return compact_frame(result) if compact else result
+
+
+def iter_track_audio_features(queries=None, ids=None, access_token=None, max_workers=None):
     if queries is not None:
         search_results = search_spotify(queries, "track", access_token=access_token)
         ids = [track['id'] for track in search_results]
     
     if not ids:
         raise ValueError("No track ids provided or found.")
-    
-    url = 'https://api.spotify.com/v1/audio-features'
-    headers = {'Authorization': f'Bearer {access_token}'}
-    params = {'ids': ','.join(ids)}
-    
-    response = requests.get(url, headers=headers, params=params)
-    
-    if response.status_code != 200:
-        raise Exception(f"Failed to get track audio features: {response.text}")
-    
-    result = response.json()['audio_features']
-    
-    df = pd.DataFrame(result)
-    df = df.drop(columns=['type', 'uri', 'track_href', 'analysis_url'])
-    df = df.rename(columns={'id': 'track_id'})
-    
-    return df
+
+    # Unknown ids come back as null and are skipped
+    return (feature_record(feature) for feature in _iter_audio_features(ids, access_token, max_workers) if feature)
+
+
+def _iter_audio_features(ids, access_token, max_workers=None):
+    # Any number of ids, sent as concurrent requests of up to 100 ids each.
+    # Features already in the entity store are not requested again.
+    def request(chunk):
+        response = api_get('/audio-features', access_token, params={'ids': ','.join(chunk)}, error="Failed to get track audio features")
+        return response['audio_features']
+    for features in iter_map(lambda chunk: fetch_missing('audio_features', chunk, request), chunked(ids, MAX_AUDIO_FEATURE_IDS), max_workers):
+        yield from features
 
 
+def _track_features_frame(result):
+    return records_frame((feature_record(feature) for feature in result if feature), FeatureRecord)
 
-def get_albums(queries=None, ids=None, access_token=None):
-     if queries is not None:
+
+def get_albums(queries=None, ids=None, access_token=None, max_workers=None):
+    return records_frame(iter_albums(queries, ids, access_token, max_workers), AlbumRecord)
+
+
+def iter_albums(queries=None, ids=None, access_token=None, max_workers=None):
+    if queries is not None:
         search_results = search_spotify(queries, "album", access_token)
         ids = [album['id'] for album in search_results]
-     if not ids:
+    if not ids:
         raise ValueError("No album ids provided or found.")
-     
-     url = 'https://api.spotify.com/v1/albums'
-     headers = {'Authorization': f'Bearer {access_token}'}
-     if len(ids) > 1:
-        url += '?ids=' + ','.join(ids) + '&market=US'
-        response = requests.get(url, headers=headers)
-     else:
-        url += '/' + ids[0] + '?market=US'
-        response = requests.get(url, headers=headers)
-     if response.status_code != 200:
-        raise Exception(f"Failed to get album info: {response.text}")
-     album_data = response.json()
-     if len(ids) > 1:
-        albums = album_data['albums']
-     else:
-        albums = [album_data]
-
-     data = []
-     for album in albums:
-        for artist in album['artists']:
-            data.append({
-                'album_id': album['id'],
-                'label': album['label'],
-                'album_name': album['name'],
-                'artist_id': artist['id'],
-                'artist_name': artist['name'],
-                'release_date': album['release_date'],
-                'total_tracks': album['total_tracks'],
-                'album_type': album['album_type'],
-                'popularity': album.get('popularity', None)  # Not all responses might have popularity
-             })
-            
-     df = pd.DataFrame(data)
-     return df
-
-
-def get_album_tracks(query=None, ids=None, access_token=None, limit=20, offset=0):
-    if query is not None:
-        search_url = "https://api.spotify.com/v1/search"
-        search_headers = {'Authorization': f'Bearer {access_token}'}
-        search_params = {'q': query, 'type': 'album', 'market': 'US', 'limit': 1}
-        search_response = requests.get(search_url, headers=search_headers, params=search_params)
+    return (record for album in _iter_albums(ids, access_token, max_workers) for record in album_records(album))
+
+
+def _iter_albums(ids, access_token, max_workers=None):
+    # Full album objects in input order, fetched in concurrent batches of up to 20 ids
+    # unless the entity store already holds them. Unknown ids come back as null in the
+    # batched responses and are skipped.
+    def request(chunk):
+        if len(chunk) == 1:
+            return [api_get('/albums/' + chunk[0], access_token, params={'market': 'US'}, error="Failed to get album info")]
+        return api_get('/albums', access_token, params={'ids': ','.join(chunk), 'market': 'US'}, error="Failed to get album info")['albums']
+    for albums in iter_map(lambda chunk: fetch_missing('albums', chunk, request), chunked(ids, MAX_ALBUM_IDS), max_workers):
+        yield from (album for album in albums if album)
+
+
+def _albums_frame(albums):
+    return records_frame((record for album in albums if album for record in album_records(album)), AlbumRecord)
+
+
+def get_album_tracks(query=None, ids=None, access_token=None, limit=None, offset=0, max_workers=None, prefetch=False):
+    return records_frame(iter_album_tracks(query, ids, access_token, limit, offset, max_workers, prefetch), TrackRecord)
+
 
-        if search_response.status_code != 200:
-            raise Exception(f"Failed to search for album: {search_response.text}")
-        search_results = search_response.json()
-        ids = [album['id'] for album in search_results['albums']['items']] if search_results['albums']['items'] else None
+def iter_album_tracks(query=None, ids=None, access_token=None, limit=None, offset=0, max_workers=None, prefetch=False):
+    items = _iter_album_track_items(query, ids, access_token, limit, offset, max_workers, prefetch)
+    return (track_record(track, album_id) for track, album_id in items)
+
+
+def _iter_album_track_items(query=None, ids=None, access_token=None, limit=None, offset=0, max_workers=None, prefetch=False):
+    # (track, album_id) pairs of raw track objects, for iter_album_tracks and export.py
+    if query is not None:
+        ids = [album['id'] for album in search_items([query], "album", access_token, market='US')]
 
     if not ids:
         raise ValueError("No album ids provided or found.")
     
     if len(ids) == 1:
-        # Fetch tracks for a single album
-        url = f"https://api.spotify.com/v1/albums/{ids[0]}/tracks"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        params = {'market': 'US', 'limit': limit, 'offset': offset}
-        response = requests.get(url, headers=headers, params=params)
-    else:
-        url = "https://api.spotify.com/v1/albums"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        params = {'ids': ','.join(ids), 'market': 'US', 'limit': limit, 'offset': offset}
-        response = requests.get(url, headers=headers, params=params)
-
-    if response.status_code != 200:
-        raise Exception(f"Failed to get album tracks info: {response.text}")
-   
-    tracks_data = response.json()['items'] if len(ids) == 1 else [track for album in response.json()['albums'] for track in album['tracks']['items']]
-    df = pd.DataFrame({
-        'track_id': [track['id'] for track in tracks_data],
-        'track_name': [track['name'] for track in tracks_data],
-        'disc_number': [track['disc_number'] for track in tracks_data],
-        'duration_ms': [track['duration_ms'] for track in tracks_data],
-        'explicit': [track['explicit'] for track in tracks_data],
-        'popularity': [None] * len(tracks_data),  # Popularity is not provided in this API response
-        'artist_id': [', '.join([artist['id'] for artist in track['artists']]) for track in tracks_data],
-        'artist_name': [', '.join([artist['name'] for artist in track['artists']]) for track in tracks_data],
-        'album_id': ids[0] if len(ids) == 1 else ', '.join(ids)
-    })
-    return df
-
-
-def get_artist_albums(query=None, id=None, limit=20, offset=0, access_token=None):
+        # Fetch every track of a single album (or `limit` of them, starting at `offset`)
+        params = {'market': 'US', 'offset': offset}
+        tracks = paginate(f"/albums/{ids[0]}/tracks", access_token, params=params, limit=limit, prefetch=prefetch, error="Failed to get album tracks info")
+        return ((track, ids[0]) for track in tracks)
+
+    # Several albums: start from the track listings embedded in the batched /albums responses
+    # and page through the rest of any album longer than one page
+    albums = _iter_albums(ids, access_token, max_workers)
+    album_tracks = iter_map(lambda album: (album['id'], _album_track_items(album, access_token, prefetch)), albums, max_workers)
+    return ((track, album_id) for album_id, tracks in album_tracks for track in tracks)
+
+
+def _album_track_items(album, access_token, prefetch=False):
+    if not album['tracks'].get('next'):
+        return album['tracks']['items']
+    return list(follow_pages(album['tracks'], access_token, prefetch=prefetch, error="Failed to get album tracks info"))
+
+
+def _album_tracks_frame(tracks_data, album_ids):
+    # album_ids is either one id for every track or a list aligned with tracks_data
+    if isinstance(album_ids, str):
+        album_ids = [album_ids] * len(tracks_data)
+    return records_frame(map(track_record, tracks_data, album_ids), TrackRecord)
+
+
+def get_artist_albums(query=None, id=None, limit=None, offset=0, access_token=None, prefetch=False):
+    return records_frame(iter_artist_albums(query, id, limit, offset, access_token, prefetch), ArtistAlbumRecord)
+
+
+def iter_artist_albums(query=None, id=None, limit=None, offset=0, access_token=None, prefetch=False):
+    albums = _iter_artist_album_items(query, id, limit, offset, access_token, prefetch)
+    return (artist_album_record(album) for album in albums)
+
+
+def _iter_artist_album_items(query=None, id=None, limit=None, offset=0, access_token=None, prefetch=False):
+    # Raw simplified album objects, for iter_artist_albums and export.py
     if query is not None:
-        search_url = 'https://api.spotify.com/v1/search'
-        search_params = {
-            'q': query,
-            'type': 'artist',
-            'limit': 1
-        }
-        headers = {
-            'Authorization': 'Bearer ' + access_token
-        }
-        search_response = requests.get(search_url, params=search_params, headers=headers)
-        search_response.raise_for_status()
-        search_results = search_response.json()
-        if 'artists' in search_results and 'items' in search_results['artists']:
-            id = search_results['artists']['items'][0]['id']
-
-    url = f'https://api.spotify.com/v1/artists/{id}/albums'
+        search_results = search_items([query], "artist", access_token)
+        if not search_results:
+            raise ValueError(f"No artist found for query: {query}")
+        id = search_results[0]['id']
+
     params = {
         'include_groups': 'album',
         'market': 'US',
-        'limit': limit,
         'offset': offset
     }
-    headers = {
-        'Authorization': 'Bearer ' + access_token
-    }
-    response = requests.get(url, params=params, headers=headers)
-    response.raise_for_status()
-    result = response.json()
-
-    albums = result.get('items', [])
-    cleaned_albums = []
-    for album in albums:
-        artists = [{'id': artist['id'], 'name': artist['name']} for artist in album['artists']]
-        cleaned_album = {
-            'album_type': album['album_type'],
-            'album_id': album['id'],
-            'album_name': album['name'],
-            'release_date': album['release_date'],
-            'total_tracks': album['total_tracks'],
-            'artist_id': ', '.join(artist['id'] for artist in artists),
-            'artist_name': ', '.join(artist['name'] for artist in artists)
-        }
-        cleaned_albums.append(cleaned_album)
-
-    results = pd.DataFrame(cleaned_albums)
-    return results
+    return paginate(f'/artists/{id}/albums', access_token, params=params, limit=limit, prefetch=prefetch, error="Failed to fetch albums")
 
 
 def get_album_summary(query=None, id=None, access_token=None):
@@ -182,12 +154,21 @@ def get_album_summary(query=None, id=None, access_token=None):
         raise ValueError("No album id provided or found.")
 
     album = get_albums(ids=id, access_token=access_token)
-    tracks = get_album_tracks(ids=id, access_token=access_token)
-    features = get_track_audio_features(ids=tracks['track_id'].tolist(), access_token=access_token)
 
-    summary = features[['danceability', 'energy', 'loudness', 'speechiness', 'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo', 'duration_ms', 'mode']].agg(['mean', 'std'])
-    summary_flat = summary.unstack().to_frame().T
-    summary_flat.columns = [f"{stat}_{feat}" for feat, stat in summary_flat.columns]
+    # Track ids stream through in windows and their features fold into running stats,
+    # so the summary never holds a track or feature table
+    stats = RunningStats(ALBUM_SUMMARY_FEATURES)
+    track_ids = (track['id'] for track, album_id in _iter_album_track_items(ids=id, access_token=access_token))
+    found = False
+    for window in iter_chunked(track_ids, ALBUM_SUMMARY_WINDOW):
+        found = True
+        stats.update([[feature[name] if feature[name] is not None else float('nan') for name in ALBUM_SUMMARY_FEATURES]
+                      for feature in _iter_audio_features(window, access_token) if feature])
+    if not found:
+        raise ValueError("No track ids provided or found.")
+
+    summary_flat = pd.DataFrame([[value for mean, std in zip(stats.means()[0], stats.stds()[0]) for value in (mean, std)]])
+    summary_flat.columns = [f"{stat}_{feat}" for feat in ALBUM_SUMMARY_FEATURES for stat in ('mean', 'std')]
 
     result = pd.concat([album.reset_index(drop=True), summary_flat.reset_index(drop=True)], axis=1)
     result = result.drop(columns=['label', 'release_date', 'artist_id', 'artist_name'])
@@ -195,7 +176,14 @@ def get_album_summary(query=None, id=None, access_token=None):
     return result
 
 
-def get_album_track_features(query=None, ids=None, access_token=None):
+ALBUM_SUMMARY_FEATURES = ['danceability', 'energy', 'loudness', 'speechiness', 'acousticness', 'instrumentalness',
+                          'liveness', 'valence', 'tempo', 'duration_ms', 'mode']
+
+# Track ids whose features are fetched and folded in per step
+ALBUM_SUMMARY_WINDOW = 1000
+
+
+def get_album_track_features(query=None, ids=None, access_token=None, compact=False):
     tracks = get_album_tracks(query=query, ids=ids, access_token=access_token)
     track_ids = tracks['track_id'].tolist()
     features = get_track_audio_features(ids=track_ids, access_token=access_token)
@@ -204,10 +192,4 @@ def get_album_track_features(query=None, ids=None, access_token=None):
     result = result.drop(columns=['duration_ms_x', 'disc_number'])
     result = result.rename(columns={'duration_ms_y': 'duration_ms'})
 
-    return result
-
-
-client_id = os.getenv('SPOTIFY_CLIENT_ID')
-client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-access_token = get_spotify_access_token(client_id, client_secret)
-
+    return compact_frame(result) if compact else result
@@ -1,65 +1,74 @@
-import os
-import requests
-from authorize import get_spotify_access_token
-from authorize import search_spotify
-from constants import pitch_class_lookup
-import pandas as pd
-
-def get_artists(queries=None, ids=None, access_token=None):
+from .album_functions import _iter_album_track_items, _iter_audio_features, get_album_tracks, get_track_audio_features
+from .authorize import search_spotify
+from .transport import api_get, paginate
+from .concurrency import chunked, iter_chunked, iter_map, parallel_map
+from .entity_store import fetch_missing
+from .constants import MAX_ARTIST_IDS, key_mode_names, key_names, mode_lookup, mode_names, pitch_class_lookup
+from .stats import RunningStats
+from .compact import compact_frame
+from .records import ArtistRecord, ProjectRecord, artist_record, project_record, records_frame
+from .search import search
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+def get_artists(queries=None, ids=None, access_token=None, max_workers=None):
+    return records_frame(iter_artists(queries, ids, access_token, max_workers), ArtistRecord)
+
+def iter_artists(queries=None, ids=None, access_token=None, max_workers=None):
+    return (artist_record(artist) for artist in _iter_artist_items(queries, ids, access_token, max_workers))
+
+def _iter_artist_items(queries=None, ids=None, access_token=None, max_workers=None):
+    # Raw artist objects, for iter_artists and export.py
     if queries is not None:
         search_results = search_spotify(queries, "artist", access_token)
         ids = [artist['id'] for artist in search_results]
     if not ids:
         raise ValueError("No artist ids provided or found.")
-    url = 'https://api.spotify.com/v1/artists'
-    headers = {'Authorization': f'Bearer {access_token}'}
-    if len(ids) > 1:
-        url += '?ids=' + ','.join(ids)
-        response = requests.get(url, headers=headers)
-    else:
-        url += '/' + ids[0]
-        response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"Failed to get artist info: {response.text}")
-    artist_data = response.json()
-    if len(ids) > 1:
-        artists = artist_data['artists']
-    else:
-        artists = [artist_data]  # Make single dict a list for uniform handling
-    df = pd.DataFrame({
-        'artist_id': [artist['id'] for artist in artists],
-        'artist_name': [artist['name'] for artist in artists],
-        'genres': [', '.join(artist['genres']) for artist in artists],
-        'popularity': [artist['popularity'] for artist in artists],
-        'type': [artist['type'] for artist in artists],
-        'followers_total': [artist['followers']['total'] for artist in artists],
-    })
-    return df
-
-def get_artist_projects(query=None, id=None, access_token=None, limit=20, offset=0):
+    return _iter_artists(ids, access_token, max_workers)
+
+def _iter_artists(ids, access_token, max_workers=None):
+    # Full artist objects in input order, fetched in concurrent batches of up to 50 ids
+    # unless the entity store already holds them. Unknown ids come back as null in the
+    # batched responses and are skipped.
+    def request(chunk):
+        if len(chunk) == 1:
+            return [api_get('/artists/' + chunk[0], access_token, error="Failed to get artist info")]  # Make single dict a list for uniform handling
+        return api_get('/artists', access_token, params={'ids': ','.join(chunk)}, error="Failed to get artist info")['artists']
+    for artists in iter_map(lambda chunk: fetch_missing('artists', chunk, request), chunked(ids, MAX_ARTIST_IDS), max_workers):
+        yield from (artist for artist in artists if artist)
+
+def _artists_frame(artists):
+    return records_frame((artist_record(artist) for artist in artists if artist), ArtistRecord)
+
+def get_artist_projects(query=None, id=None, access_token=None, limit=None, offset=0, prefetch=False):
+    return records_frame(iter_artist_projects(query, id, access_token, limit, offset, prefetch), ProjectRecord)
+
+def iter_artist_projects(query=None, id=None, access_token=None, limit=None, offset=0, prefetch=False):
     if query:
-        access_token = get_spotify_access_token(client_id, client_secret)
         search_results = search_spotify([query],"artist", access_token)
         id = search_results[0]['id'] if search_results else None
     if not id:
         raise ValueError("Artist ID must be provided or found through a search query.")
     
-    url = f'https://api.spotify.com/v1/artists/{id}/albums'
-    headers = {'Authorization': f'Bearer {access_token}'}
     params = {
         'include_groups': 'album,single',
         'market': 'US',
-        'limit': limit,
         'offset': offset
     }
-    response = requests.get(url, headers=headers, params=params)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch albums: {response.text}")
+    albums = paginate(f'/artists/{id}/albums', access_token, params=params, limit=limit, prefetch=prefetch, error="Failed to fetch albums")
     
-    albums = response.json().get('items', [])
-    df = pd.DataFrame.from_records(albums)
-    df = df[['id', 'name', 'release_date', 'release_date_precision']].rename(columns={'id': 'album_id', 'name': 'album_name'}).drop_duplicates()
-    return df
+    return _unique(map(project_record, albums))
+
+def _unique(records):
+    seen = set()
+    for record in records:
+        if record not in seen:
+            seen.add(record)
+            yield record
+
+def _projects_frame(albums):
+    return records_frame(_unique(map(project_record, albums)), ProjectRecord)
 
 def get_related_artists(query=None, id=None, access_token=None):
     if query:
@@ -71,14 +80,13 @@ def get_related_artists(query=None, id=None, access_token=None):
     if not id:
         raise ValueError("Artist ID must be provided or found through a search query.")
     
-    url = f"https://api.spotify.com/v1/artists/{id}/related-artists"
-    headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.get(url, headers=headers)
+    return _related_artists_frame(_related_artists(id, access_token))
 
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch related artists: {response.text}")
-    
-    related_artists = response.json()['artists']
+def _related_artists(id, access_token):
+    # Raw artist objects related to one artist, for get_related_artists and crawl.py
+    return api_get(f"/artists/{id}/related-artists", access_token, error="Failed to fetch related artists")['artists']
+
+def _related_artists_frame(related_artists):
     df = pd.DataFrame(related_artists)
     
     # Define columns to drop
@@ -95,78 +103,9 @@ def get_related_artists(query=None, id=None, access_token=None):
 
     return df
 
-def get_album_tracks(query=None, ids=None, access_token=None, limit=20, offset=0):
-    if query is not None:
-        # Search for the album by name and get the ID
-        search_url = "https://api.spotify.com/v1/search"
-        search_headers = {'Authorization': f'Bearer {access_token}'}
-        search_params = {'q': query, 'type': 'album', 'market': 'US', 'limit': 1}
-        search_response = requests.get(search_url, headers=search_headers, params=search_params)
-        if search_response.status_code != 200:
-            raise Exception(f"Failed to search for album: {search_response.text}")
-        search_results = search_response.json()
-        ids = [album['id'] for album in search_results['albums']['items']] if search_results['albums']['items'] else None
-    
-    if not ids:
-        raise ValueError("No album ids provided or found.")
-
-    # Check if single ID or multiple IDs are provided
-    if len(ids) == 1:
-        # Fetch tracks for a single album
-        url = f"https://api.spotify.com/v1/albums/{ids[0]}/tracks"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        params = {'market': 'US', 'limit': limit, 'offset': offset}
-        response = requests.get(url, headers=headers, params=params)
-    else:
-        # Fetch tracks for multiple albums (not typical but supported)
-        url = "https://api.spotify.com/v1/albums"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        params = {'ids': ','.join(ids), 'market': 'US', 'limit': limit, 'offset': offset}
-        response = requests.get(url, headers=headers, params=params)
-
-    if response.status_code != 200:
-        raise Exception(f"Failed to get album tracks info: {response.text}")
-    
-    # Extract and transform track data into DataFrame
-    tracks_data = response.json()['items'] if len(ids) == 1 else [track for album in response.json()['albums'] for track in album['tracks']['items']]
-    df = pd.DataFrame({
-        'track_id': [track['id'] for track in tracks_data],
-        'track_name': [track['name'] for track in tracks_data],
-        'disc_number': [track['disc_number'] for track in tracks_data],
-        'duration_ms': [track['duration_ms'] for track in tracks_data],
-        'explicit': [track['explicit'] for track in tracks_data],
-        'popularity': [None] * len(tracks_data),  # Popularity is not provided in this API response
-        'artist_id': [', '.join([artist['id'] for artist in track['artists']]) for track in tracks_data],
-        'artist_name': [', '.join([artist['name'] for artist in track['artists']]) for track in tracks_data],
-        'album_id': ids[0] if len(ids) == 1 else ', '.join(ids)
-    })
-    return df
-
-def get_track_audio_features(queries=None, ids=None, access_token=None):
-    if ids and len(ids) > 100:
-        raise ValueError("The maximum length of the ids vector is 100. Please shorten the length of the input vector.")
-    if queries is not None:
-        search_results = search_spotify(queries, "track", access_token=access_token)
-        ids = [track['id'] for track in search_results]
-    if not ids:
-        raise ValueError("No track ids provided or found.")
-    url = 'https://api.spotify.com/v1/audio-features'
-    headers = {'Authorization': f'Bearer {access_token}'}
-    params = {'ids': ','.join(ids)}
-    response = requests.get(url, headers=headers, params=params)
-    if response.status_code != 200:
-        raise Exception(f"Failed to get track audio features: {response.text}")
-    result = response.json()['audio_features']
-    df = pd.DataFrame(result)
-    df = df.drop(columns=['type', 'uri', 'track_href', 'analysis_url'])
-    df = df.rename(columns={'id': 'track_id'})
-    return df
-
-def get_artist_audio_features(query=None, id=None, access_token=None):
-    authorization = get_spotify_access_token(client_id, client_secret)
-    
+def get_artist_audio_features(query=None, id=None, access_token=None, max_workers=None, compact=False):
     # Get artist information
-    info = get_artists(queries=[query] if query else None, ids=[id] if id else None, access_token=authorization)
+    info = get_artists(queries=[query] if query else None, ids=[id] if id else None, access_token=access_token)
     if info.empty:
         raise ValueError("No artist found with the inputted ID. Please try again with a different ID.")
     
@@ -174,42 +113,69 @@ def get_artist_audio_features(query=None, id=None, access_token=None):
     artist_name = info['artist_name'].iloc[0]
     
     # Get albums for the artist
-    albums = get_artist_projects(id=artist_id, access_token=authorization)
+    albums = get_artist_projects(id=artist_id, access_token=access_token, prefetch=True)
     if albums.empty:
         raise ValueError("No albums found with the inputted ID. Please try again with a different ID.")
     
-    # Paginate through many albums
-    num_loops = (len(albums) + 49) // 50
-    if num_loops > 1:
-        all_albums = []
-        for i in range(num_loops):
-            more_albums = get_artist_projects(id=artist_id, offset=i*50, access_token=authorization)
-            all_albums.append(more_albums)
-        albums = pd.concat(all_albums).reset_index(drop=True)
-
-    # Process album release year based on precision
-    albums['album_release_year'] = albums.apply(lambda row: int(row['release_date'][:4]) if row['release_date_precision'] == 'year' else int(row['release_date'][:4]) if row['release_date_precision'] == 'day' else None, axis=1)
-    
-    # Retrieve tracks for each album
-    # Retrieve tracks for each album
-    tracks = pd.concat([get_album_tracks(ids=[album_id], access_token=authorization) for album_id in albums['album_id']])
-
-    # Paginate through tracks if necessary
-    num_loops_tracks = (len(tracks) + 99) // 100
-    track_audio_features = pd.concat([get_track_audio_features(ids=tracks['track_id'].iloc[i*100:(i+1)*100].tolist(), access_token=authorization) for i in range(num_loops_tracks)])
+    # Retrieve tracks for every album; batched 20 albums and 100 tracks per request
+    tracks = get_album_tracks(ids=albums['album_id'].tolist(), access_token=access_token, max_workers=max_workers)
+    track_audio_features = get_track_audio_features(ids=tracks['track_id'].tolist(), access_token=access_token, max_workers=max_workers)
+
+    result = _artist_audio_features_frame(albums, tracks, track_audio_features, artist_name, artist_id)
+    return compact_frame(result) if compact else result
+
+def get_artists_audio_features(ids, access_token=None, max_workers=None, compact=False):
+    # get_artist_audio_features for many artists at once. Artists, album tracks and audio
+    # features are fetched in batches shared by every artist, so each album and track is
+    # requested once however many of the artists it belongs to
+    info = get_artists(ids=ids, access_token=access_token, max_workers=max_workers)
+    albums = _artists_projects(info, access_token, max_workers)
+    _require_albums(info, albums)
+    result = _albums_audio_features(albums, access_token, max_workers)
+    return compact_frame(result) if compact else result
+
+def _artists_projects(info, access_token, max_workers=None):
+    # Every artist's releases in one frame, tagged with artist_name and artist_id;
+    # listing releases is the only per-artist request
+    listings = parallel_map(
+        lambda artist_id: get_artist_projects(id=artist_id, access_token=access_token, prefetch=True),
+        info['artist_id'].tolist(), max_workers
+    )
+    return pd.concat(
+        [albums.assign(artist_name=artist_name, artist_id=artist_id)
+         for artist_name, artist_id, albums in zip(info['artist_name'], info['artist_id'], listings)],
+        ignore_index=True
+    )
+
+def _require_albums(info, albums):
+    # Artists without releases are an error for the bulk getters; sync skips them instead
+    found = set(albums['artist_id'])
+    for artist_id in info['artist_id']:
+        if artist_id not in found:
+            raise ValueError(f"No albums found for artist {artist_id}. Please try again with a different ID.")
+
+def _albums_audio_features(albums, access_token, max_workers=None):
+    # Rows for every album in albums (which carries artist_name and artist_id), with all
+    # tracks and features fetched in one set of batches
+    tracks = get_album_tracks(ids=albums['album_id'].unique().tolist(), access_token=access_token, max_workers=max_workers)
+    track_audio_features = get_track_audio_features(ids=tracks['track_id'].unique().tolist(), access_token=access_token, max_workers=max_workers)
+    return _artist_audio_features_frame(albums, tracks, track_audio_features)
+
+def _artist_audio_features_frame(albums, tracks, track_audio_features, artist_name=None, artist_id=None):
+    # Release year is only trusted for 'year' and 'day' precision
+    year = pd.to_numeric(albums['release_date'].str[:4], errors='coerce').astype('Int64')
+    albums = albums.assign(album_release_year=year.where(albums['release_date_precision'].isin(['year', 'day'])))
 
     # Merge track details with audio features
     tracks = tracks.merge(track_audio_features, on='track_id', how='left')
 
-    # Prepare final DataFrame
-    albums = albums.assign(artist_name=artist_name, artist_id=artist_id)
+    # Prepare final DataFrame; albums already tagged with their artist keep those columns
+    if artist_id is not None:
+        albums = albums.assign(artist_name=artist_name, artist_id=artist_id)
     result = albums[['artist_name', 'artist_id', 'album_id', 'release_date', 'album_release_year', 'release_date_precision', 'album_name']]
     result = result.merge(tracks, on='album_id', how='left')
 
-    # Further processing on keys and modes
-    result['key_name'] = result['key'].apply(lambda x: pitch_class_lookup.get(x, 'Unknown'))
-    result['mode_name'] = result['mode'].apply(lambda x: 'major' if x == 1 else 'minor' if x == 0 else None)
-    result['key_mode'] = result.apply(lambda row: f"{row['key_name']} {row['mode_name']}", axis=1)
+    result = _add_key_modes(result)
 
     # Clean up and rename as necessary
     result = result.rename(columns={'duration_ms_x': 'duration_ms'})
@@ -217,43 +183,89 @@ def get_artist_audio_features(query=None, id=None, access_token=None):
 
     return result
 
-def get_artists_summary(queries=None, ids=None, access_token=None):
+def _add_key_modes(result):
+    # key_name, mode_name and key_mode as categoricals ordered by pitch class
+    key_name = result['key'].map(pitch_class_lookup).fillna('Unknown').astype(str)
+    mode_name = result['mode'].map(mode_lookup)
+    key_mode = key_name + ' ' + mode_name.fillna('None').astype(str)
+    extra_key_modes = sorted(set(key_mode.unique()) - set(key_mode_names))
+    result['key_name'] = pd.Categorical(key_name, categories=key_names)
+    result['mode_name'] = pd.Categorical(mode_name, categories=mode_names)
+    result['key_mode'] = pd.Categorical(key_mode, categories=key_mode_names + extra_key_modes)
+    return result
+
+def get_artists_summary(queries=None, ids=None, access_token=None, max_workers=None):
     if queries:
-        summaries = [get_artist_summary(query=query, access_token=access_token) for query in queries]
-    elif ids:
-        summaries = [get_artist_summary(id=artist_id, access_token=access_token) for artist_id in ids]
-    else:
+        # Every query must find an artist, so the rows line up with the queries
+        results = search(queries, "artist", access_token, max_workers=max_workers)
+        unmatched = [str(result.query) for result in results if not result.matched]
+        if unmatched:
+            raise ValueError(f"No artist found for: {', '.join(unmatched)}")
+        ids = [result.ids[0] for result in results]
+    elif not ids:
         raise ValueError("Either queries or ids must be provided.")
 
-    return pd.concat(summaries, ignore_index=True)
-
-def get_artist_summary(query=None, id=None, access_token=None):
-    # Get artist information
-    artist = get_artists(queries=[query] if query else None, ids=[id] if id else None, access_token=access_token)
-    artist = artist[['artist_name', 'artist_id']]
-    
-    # Get artist audio features
-    features = get_artist_audio_features(query=query, id=id, access_token=access_token)
+    info = get_artists(ids=ids, access_token=access_token, max_workers=max_workers)
+    artists = info.drop_duplicates('artist_id').reset_index(drop=True)
+    albums = _artists_projects(artists, access_token, max_workers)
+    _require_albums(artists, albums)
+
+    # The groups (artists) each album's tracks count towards
+    group = {artist_id: index for index, artist_id in enumerate(artists['artist_id'])}
+    album_groups = {}
+    for album_id, artist_id in zip(albums['album_id'], albums['artist_id']):
+        album_groups.setdefault(album_id, []).append(group[artist_id])
+
+    # Tracks stream through in windows; each window's features are fetched in shared
+    # batches and folded into per-artist running stats, so no track table is built
+    stats = RunningStats(SUMMARY_FEATURES, groups=len(group))
+    seen = set()
+    items = _iter_album_track_items(ids=list(album_groups), access_token=access_token, max_workers=max_workers)
+    for window in iter_chunked(items, SUMMARY_WINDOW):
+        track_ids = list(dict.fromkeys(track['id'] for track, album_id in window))
+        features = dict(zip(track_ids, _iter_audio_features(track_ids, access_token, max_workers)))
+        values, groups = [], []
+        for track, album_id in window:
+            seen.add(album_id)
+            row = _summary_values(track, features.get(track['id']))
+            for index in album_groups[album_id]:
+                values.append(row)
+                groups.append(index)
+        stats.update(values, groups)
+
+    # An album without tracks still counts as one (empty) song, as in get_artist_audio_features
+    empty = [index for album_id, indexes in album_groups.items() if album_id not in seen for index in indexes]
+    if empty:
+        stats.update([[float('nan')] * len(SUMMARY_FEATURES)] * len(empty), empty)
+
+    # One row per requested artist, in request order, with <feature>_<stat> columns
+    rows = [group[artist_id] for artist_id in info['artist_id']]
+    result = info[['artist_name', 'artist_id']].reset_index(drop=True)
+    result['num_songs'] = stats.rows[rows]
+    means, stds = stats.means()[rows], stats.stds()[rows]
+    for column, feature in enumerate(SUMMARY_FEATURES):
+        result[feature + '_mean'] = means[:, column]
+        result[feature + '_std'] = stds[:, column]
+    return result
 
-    # Calculate number of songs
-    num_songs = features.shape[0]
+SUMMARY_FEATURES = ['danceability', 'energy', 'loudness', 'speechiness', 'acousticness',
+                    'instrumentalness', 'liveness', 'valence', 'explicit', 'tempo', 'duration_ms', 'mode']
 
-    # Create summary statistics
-    summary = features[['danceability', 'energy', 'loudness', 'speechiness', 'acousticness', 
-                        'instrumentalness', 'liveness', 'valence', 'explicit', 'tempo', 'duration_ms', 'mode']].agg(['mean', 'std']).T.reset_index()
-    summary.columns = ['feature', 'mean', 'std']
+# Album tracks folded into the running stats per step
+SUMMARY_WINDOW = 1000
 
-    # Add artist information
-    result = pd.DataFrame({'artist_name': [artist['artist_name'].iloc[0]], 
-                           'artist_id': [artist['artist_id'].iloc[0]], 
-                           'num_songs': [num_songs]})
-    
-    # Combine results
-    for index, row in summary.iterrows():
-        result[row['feature'] + '_mean'] = row['mean']
-        result[row['feature'] + '_std'] = row['std']
+def _summary_values(track, feature):
+    # explicit and duration_ms come from the track, the rest from its audio features
+    nan = float('nan')
+    return [
+        float(track['explicit']) if name == 'explicit' else
+        track['duration_ms'] if name == 'duration_ms' else
+        feature[name] if feature and feature[name] is not None else nan
+        for name in SUMMARY_FEATURES
+    ]
 
-    return result
+def get_artist_summary(query=None, id=None, access_token=None, max_workers=None):
+    return get_artists_summary(queries=[query] if query else None, ids=[id] if id else None, access_token=access_token, max_workers=max_workers)
 
 def get_artist_top_tracks(query=None, id=None, access_token=None):
     # If a query is provided, search for the artist to get the ID
@@ -266,21 +278,20 @@ def get_artist_top_tracks(query=None, id=None, access_token=None):
     if not id:
         raise ValueError("Artist ID must be provided or found through a search query.")
     
-    url = f"https://api.spotify.com/v1/artists/{id}/top-tracks"
-    headers = {'Authorization': f'Bearer {access_token}'}
     params = {'market': 'US'}
-    response = requests.get(url, headers=headers, params=params)
-
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch top tracks: {response.text}")
+    response = api_get(f"/artists/{id}/top-tracks", access_token, params=params, error="Failed to fetch top tracks")
     
-    top_tracks = response.json()['tracks']
+    return _top_tracks_frame(response['tracks'])
+
+def _top_tracks_frame(top_tracks):
     df = pd.DataFrame(top_tracks)
     
     # Process artist information within the tracks
-    df['artists'] = df['artists'].apply(lambda artists: [{'id': artist['id'], 'name': artist['name']} for artist in artists])
-    df['artist_id'] = df['artists'].apply(lambda artists: ', '.join([artist['id'] for artist in artists]))
-    df['artist_name'] = df['artists'].apply(lambda artists: ', '.join([artist['name'] for artist in artists]))
+    # One row per (track, artist), then join each track's artists back together
+    exploded = df['artists'].explode()
+    artists = pd.DataFrame(exploded.tolist(), index=exploded.index)[['id', 'name']].groupby(level=0).agg(', '.join)
+    df['artist_id'] = artists['id']
+    df['artist_name'] = artists['name']
 
     # Define columns to drop and check for their existence
     columns_to_drop = [
@@ -311,10 +322,3 @@ def get_artist_top_tracks(query=None, id=None, access_token=None):
     df = df[columns_order]
 
     return df
-
-client_id = os.getenv('SPOTIFY_CLIENT_ID')
-client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-access_token = get_spotify_access_token(client_id, client_secret)
-#queries = ["Taylor Swift", "Gracie Abrams"]
-artist_df = get_artist_top_tracks(query = "Taylor Swift", access_token=access_token)
-print(artist_df)
\ No newline at end of file
@@ -1,29 +1,69 @@
-import requests
-from dotenv import load_dotenv
+import os
+import threading
+import time
 
-load_dotenv()
+from .search import search_items
+from .transport import api_post
 
-def get_spotify_access_token(client_id, client_secret):
-    auth_url = 'https://accounts.spotify.com/api/token'
-    auth_response = requests.post(auth_url, {
+_default_provider = None
+_default_lock = threading.Lock()
+
+def request_access_token(client_id, client_secret):
+    return api_post({
         'grant_type': 'client_credentials',
         'client_id': client_id,
         'client_secret': client_secret,
-    })
-    if auth_response.status_code != 200:
-        raise Exception(f"Failed to get access token: {auth_response.text}")
-    return auth_response.json()['access_token']
-
-def search_spotify(queries, search_type, access_token):
-    search_results = []
-    for query in queries:
-        search_url = 'https://api.spotify.com/v1/search'
-        headers = {'Authorization': f'Bearer {access_token}'}
-        params = {'q': query, 'type': search_type, 'limit': 1}  # Set limit to 1 for demo purposes
-        response = requests.get(search_url, headers=headers, params=params)
-        if response.status_code == 200:
-            search_results.extend(response.json()[f'{search_type}s']['items'])
-        else:
-            print(f"Failed to search for {query}: {response.text}")
-    return search_results
+    }, error="Failed to get access token")
+
+def get_spotify_access_token(client_id, client_secret):
+    return request_access_token(client_id, client_secret)['access_token']
+
+class TokenProvider:
+    # Caches a client-credentials token and fetches a new one shortly before it expires.
+    # Can be passed anywhere an access_token string is accepted.
+    # Credentials left as None are read from the environment (and .env) on first use.
+    def __init__(self, client_id=None, client_secret=None, refresh_margin=60):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        with self._lock:
+            if self.needs_refresh():
+                if self.client_id is None or self.client_secret is None:
+                    self._load_credentials()
+                auth_data = request_access_token(self.client_id, self.client_secret)
+                self._token = auth_data['access_token']
+                self._expires_at = time.monotonic() + auth_data.get('expires_in', 3600)
+            return self._token
+
+    def needs_refresh(self):
+        return self._token is None or time.monotonic() >= self._expires_at - self.refresh_margin
+
+    def _load_credentials(self):
+        from dotenv import load_dotenv
+        load_dotenv()
+        self.client_id = self.client_id or os.getenv('SPOTIFY_CLIENT_ID')
+        self.client_secret = self.client_secret or os.getenv('SPOTIFY_CLIENT_SECRET')
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+
+    def __str__(self):
+        return self.get_token()
+
+def get_default_token_provider():
+    global _default_provider
+    if _default_provider is None:
+        with _default_lock:
+            if _default_provider is None:
+                _default_provider = TokenProvider()
+    return _default_provider
 
+def search_spotify(queries, search_type, access_token=None, limit=1):
+    # Top `limit` items of every query; see search.search for per-query results
+    return search_items(queries, search_type, access_token, limit)
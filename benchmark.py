@@ -0,0 +1,170 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+import tracemalloc
+
+from .album_functions import get_album_summary
+from .artist_functions import get_artist_audio_features, get_artists_summary
+from .authorize import TokenProvider
+from .cache import get_cache, set_cache
+from .concurrency import get_max_workers, set_max_workers
+from .entity_store import EntityStore, get_entity_store, set_entity_store
+from .mock_server import MockCatalog, MockSpotifyServer
+from .scheduler import RequestScheduler, get_scheduler, set_scheduler
+from .transport import get_session, get_urls, set_session
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Offline throughput benchmarks against MockSpotifyServer:
+#
+#     python -m spotipy_gato365.benchmark --artists 200 --latency 0.02 --json results.json
+#     python -m spotipy_gato365.benchmark --baseline results.json
+#
+# Each scenario reports wall time, requests sent (retries included) and peak Python
+# memory. The server runs in a separate process so that its allocations and CPU time do
+# not count against the client. With --baseline the run fails if a scenario got slower,
+# heavier or chattier than the saved results by more than --tolerance.
+
+SCENARIOS = ('get_artist_audio_features', 'get_album_summary', 'get_artists_summary')
+
+
+def _serve(conn, catalog_options, server_options):
+    server = MockSpotifyServer(MockCatalog(**catalog_options), **server_options).start()
+    conn.send(server.port)
+    conn.recv()
+    server.stop()
+
+
+def _scenario_calls(catalog, artists_summary_size):
+    artist_ids = catalog.artist_ids()
+    return {
+        'get_artist_audio_features': lambda token: get_artist_audio_features(id=artist_ids[0], access_token=token),
+        'get_album_summary': lambda token: get_album_summary(id=catalog.album_ids(0)[:1], access_token=token),
+        'get_artists_summary': lambda token: get_artists_summary(ids=artist_ids[:artists_summary_size], access_token=token),
+    }
+
+
+def _fresh_run(func, *args):
+    # Every run starts from empty in-memory reuse and zeroed counters, so runs do the same work
+    set_entity_store(EntityStore())
+    get_scheduler().reset_stats()
+    return func(*args)
+
+
+def measure(func, *args):
+    # (result, seconds, requests, peak bytes) for one call. Tracing allocations slows
+    # Python down several times over, so time and memory come from separate runs.
+    start = time.perf_counter()
+    result = _fresh_run(func, *args)
+    seconds = time.perf_counter() - start
+    requests = sum(counters['requests'] for counters in get_scheduler().get_stats().values())
+
+    tracemalloc.start()
+    try:
+        _fresh_run(func, *args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, requests, peak
+
+
+def run_benchmarks(artists=100, albums_per_artist=20, tracks_per_album=12, latency=0.0, throttle_rate=0.0,
+                   artists_summary_size=None, max_workers=None, repeat=1, scenarios=SCENARIOS):
+    catalog_options = {'artists': artists, 'albums_per_artist': albums_per_artist, 'tracks_per_album': tracks_per_album}
+    server_options = {'latency': latency, 'throttle_rate': throttle_rate, 'retry_after': 0}
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child, catalog_options, server_options), daemon=True)
+    process.start()
+    port = parent.recv()
+    url = f'http://127.0.0.1:{port}'
+
+    # Benchmarks use a fresh client and no response cache; the caller's setup is restored after
+    saved = get_scheduler(), get_entity_store(), get_cache(), get_max_workers()
+    client = (get_session(),) + get_urls()
+    set_session(base_url=url + '/v1', auth_url=url + '/api/token')
+    set_scheduler(RequestScheduler())
+    set_cache(None)
+    if max_workers:
+        set_max_workers(max_workers)
+    results = []
+    try:
+        # Imports and the token request happen before anything is measured
+        pd.DataFrame()
+        token = TokenProvider('benchmark', 'benchmark')
+        token.get_token()
+        calls = _scenario_calls(MockCatalog(**catalog_options), artists_summary_size or artists)
+        for name in scenarios:
+            runs = [measure(calls[name], token) for _ in range(repeat)]
+            result, seconds, requests, peak = min(runs, key=lambda run: run[1])
+            results.append({
+                'scenario': name, 'rows': len(result), 'seconds': round(seconds, 4),
+                'requests': requests, 'peak_mb': round(peak / 2 ** 20, 2),
+            })
+    finally:
+        set_session(*client)
+        scheduler, store, cache, workers = saved
+        set_scheduler(scheduler)
+        set_entity_store(store)
+        set_cache(cache)
+        set_max_workers(workers)
+        parent.send('stop')
+        process.join()
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    # Regression messages for every metric that grew by more than tolerance (a fraction)
+    saved = {result['scenario']: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = saved.get(result['scenario'])
+        if before is None:
+            continue
+        for metric in ('seconds', 'requests', 'peak_mb'):
+            if result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{result['scenario']}: {metric} {before[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m spotipy_gato365.benchmark', description='Offline benchmarks against a local mock Spotify API')
+    parser.add_argument('--artists', type=int, default=100, help='artists in the mock catalog')
+    parser.add_argument('--albums-per-artist', type=int, default=20)
+    parser.add_argument('--tracks-per-album', type=int, default=12)
+    parser.add_argument('--summary-artists', type=int, default=None, help='artists passed to get_artists_summary (default: all)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--max-workers', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per scenario; the fastest is reported')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='run only these scenarios')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed growth over the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        artists=args.artists, albums_per_artist=args.albums_per_artist, tracks_per_album=args.tracks_per_album,
+        latency=args.latency, throttle_rate=args.throttle_rate, artists_summary_size=args.summary_artists,
+        max_workers=args.max_workers, repeat=args.repeat, scenarios=args.scenario or SCENARIOS,
+    )
+    print(f"{'scenario':<28}{'rows':>10}{'seconds':>10}{'requests':>10}{'peak MB':>10}")
+    for result in results:
+        print(f"{result['scenario']:<28}{result['rows']:>10}{result['seconds']:>10.3f}{result['requests']:>10}{result['peak_mb']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('regression:', regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+# Seconds a cached response counts as fresh, per endpoint (see scheduler.endpoint_name).
+# Catalog data barely changes; popularity, follower counts and search results drift faster.
+DEFAULT_TTLS = {
+    '/audio-features': 90 * 86400,
+    '/albums/{id}/tracks': 30 * 86400,
+    '/albums': 7 * 86400,
+    '/albums/{id}': 7 * 86400,
+    '/artists': 86400,
+    '/artists/{id}': 86400,
+    '/artists/{id}/albums': 86400,
+    '/artists/{id}/related-artists': 7 * 86400,
+    '/artists/{id}/top-tracks': 86400,
+    '/search': 86400,
+}
+
+
+# Cache hits only record their access time in memory; the times go to SQLite in one
+# transaction once this many are pending or this many seconds have passed, and before
+# every eviction check
+ACCESS_FLUSH_SIZE = 1000
+ACCESS_FLUSH_INTERVAL = 60
+
+
+def cache_key(path, params=None):
+    # The access token is deliberately not part of the key
+    if not params:
+        return path
+    return path + '?' + urlencode(sorted((k, str(v)) for k, v in params.items()))
+
+
+class CacheEntry:
+    __slots__ = ('data', 'etag', 'fresh')
+
+    def __init__(self, data, etag, fresh):
+        self.data = data
+        self.etag = etag
+        self.fresh = fresh
+
+
+class ResponseCache:
+    # SQLite-backed store of decoded JSON responses with per-endpoint TTLs and LRU eviction
+    # once more than max_entries are held. Stale entries are kept so that an ETag can be
+    # revalidated with If-None-Match, and so that offline=True can still serve them.
+    #
+    # Anything with the same get/set/touch/offline interface can be passed to set_cache().
+    def __init__(self, path='spotify_cache.sqlite', ttl=None, default_ttl=86400, max_entries=200000, offline=False):
+        self.path = path
+        self.ttl = dict(DEFAULT_TTLS, **(ttl or {}))
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._accessed = {}
+        self._flushed_at = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, endpoint TEXT, body TEXT, etag TEXT, stored_at REAL, accessed_at REAL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+
+    def get(self, endpoint, key):
+        with self._lock:
+            row = self._conn.execute('SELECT body, etag, stored_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE or time.monotonic() - self._flushed_at >= ACCESS_FLUSH_INTERVAL:
+                self._flush_accessed()
+        body, etag, stored_at = row
+        fresh = now - stored_at < self.ttl.get(endpoint, self.default_ttl)
+        return CacheEntry(json.loads(body), etag, fresh)
+
+    def set(self, endpoint, key, data, etag=None):
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, endpoint, json.dumps(data), etag, now, now)
+                )
+            self._writes += 1
+            # Counting rows on every write is wasteful; check the bound periodically
+            if self._writes % 100 == 0:
+                self._evict()
+
+    def touch(self, key):
+        # A 304 Not Modified makes the stored copy fresh again
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+
+    def _flush_accessed(self):
+        if self._accessed:
+            with self._conn:
+                self._conn.executemany('UPDATE responses SET accessed_at = ? WHERE key = ?', [(at, key) for key, at in self._accessed.items()])
+            self._accessed.clear()
+        self._flushed_at = time.monotonic()
+
+    def _evict(self):
+        # Recent hits must count before least-recently-used rows are chosen
+        self._flush_accessed()
+        count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        if count > self.max_entries:
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+
+    def flush(self):
+        with self._lock:
+            self._flush_accessed()
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+            with self._conn:
+                self._conn.execute('DELETE FROM responses')
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.close()
+
+
+_cache = None
+
+
+def get_cache():
+    return _cache
+
+
+def set_cache(cache=None):
+    # Responses are only cached once a cache has been installed; None switches caching off
+    global _cache
+    _cache = cache
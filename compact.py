@@ -0,0 +1,85 @@
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Smaller dtypes for the track and feature frames, for holding millions of rows in RAM:
+#
+#     features = get_artist_audio_features(id=artist_id, compact=True)
+#     memory_report(get_artist_audio_features(id=artist_id), features)
+#
+# Audio features become float32 (their values carry at most ~6 significant digits),
+# small integer columns get the narrowest type that holds their range, and ids and names
+# repeated on every track of an album or artist become categoricals, so each distinct
+# string is stored once. Columns a frame does not have are ignored.
+
+FLOAT_COLUMNS = (
+    'danceability', 'energy', 'loudness', 'speechiness', 'acousticness', 'instrumentalness',
+    'liveness', 'valence', 'tempo',
+)
+
+# Column -> integer dtype; the nullable (capitalised) variant is used when values are missing
+INT_COLUMNS = {
+    'key': 'int8',
+    'mode': 'int8',
+    'time_signature': 'int8',
+    'disc_number': 'int16',
+    'total_tracks': 'int16',
+    'album_release_year': 'int16',
+    'duration_ms': 'int32',
+}
+
+# Always nullable: simplified track objects carry no popularity at all
+NULLABLE_COLUMNS = {
+    'popularity': 'Int8',
+}
+
+CATEGORY_COLUMNS = (
+    'artist_id', 'artist_name', 'artist_id_x', 'artist_name_x', 'album_id', 'album_name', 'album_type',
+    'release_date', 'release_date_precision', 'label', 'type',
+)
+
+
+def _int_column(values, dtype):
+    if values.isna().any():
+        return values.astype(dtype.capitalize())
+    return values.astype(dtype)
+
+
+def compact_frame(df):
+    # A copy of df with compact dtypes; the values are unchanged apart from float32 rounding
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in FLOAT_COLUMNS:
+            columns[column] = values.astype('float32')
+        elif column in INT_COLUMNS:
+            columns[column] = _int_column(values, INT_COLUMNS[column])
+        elif column in NULLABLE_COLUMNS:
+            columns[column] = values.astype(NULLABLE_COLUMNS[column])
+        elif column == 'explicit' and values.dtype == object:
+            # Left merges leave NaN for albums without tracks
+            columns[column] = values.astype('boolean')
+        elif column in CATEGORY_COLUMNS and not isinstance(values.dtype, pd.CategoricalDtype):
+            columns[column] = values.astype('category')
+    return df.assign(**columns) if columns else df.copy()
+
+
+def memory_report(before, after=None):
+    # Per-column bytes (strings included) of a frame and its compact form, with a final
+    # 'total' row. after defaults to compact_frame(before).
+    if after is None:
+        after = compact_frame(before)
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'column': list(before.columns),
+        'dtype': [str(dtype) for dtype in before.dtypes],
+        'compact_dtype': [str(after[column].dtype) for column in before.columns],
+        'bytes': [int(before_bytes[column]) for column in before.columns],
+        'compact_bytes': [int(after_bytes[column]) for column in before.columns],
+    })
+    total = {'column': 'total', 'dtype': '', 'compact_dtype': '',
+             'bytes': int(report['bytes'].sum()), 'compact_bytes': int(report['compact_bytes'].sum())}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    report['saved'] = 1 - report['compact_bytes'] / report['bytes']
+    return report
@@ -0,0 +1,62 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_MAX_WORKERS = 8
+
+_max_workers = DEFAULT_MAX_WORKERS
+
+
+def get_max_workers():
+    return _max_workers
+
+
+def set_max_workers(max_workers):
+    # 1 disables concurrency entirely; requests are then made one after another
+    global _max_workers
+    _max_workers = max(1, int(max_workers))
+
+
+def parallel_map(func, items, max_workers=None):
+    # Like map(), but runs func on a bounded thread pool. Results come back in input
+    # order regardless of completion order, and the scheduler's rate limit still applies
+    # since every request goes through it.
+    items = list(items)
+    workers = get_max_workers() if max_workers is None else max(1, max_workers)
+    if workers == 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def iter_map(func, items, max_workers=None):
+    # Streaming parallel_map: yields results in input order while keeping at most
+    # max_workers calls in flight, so results never pile up in memory
+    workers = get_max_workers() if max_workers is None else max(1, max_workers)
+    if workers == 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def chunked(items, size):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def iter_chunked(items, size):
+    # Lazy chunked() for streams: lists of up to `size` items, consuming items as it goes
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
@@ -2,3 +2,22 @@ pitch_class_lookup = {
     0: 'C', 1: 'C#', 2: 'D', 3: 'D#', 4: 'E', 5: 'F',
     6: 'F#', 7: 'G', 8: 'G#', 9: 'A', 10: 'A#', 11: 'B'
 }
+
+# Most ids Spotify accepts in one request to each batch endpoint
+MAX_ALBUM_IDS = 20
+MAX_ARTIST_IDS = 50
+MAX_AUDIO_FEATURE_IDS = 100
+
+# Largest page the paging endpoints (album tracks, artist albums) return
+PAGE_SIZE = 50
+
+# Seconds to wait for a connection and then between bytes of a response; a stalled
+# request fails with a timeout and is retried like any other connection error
+DEFAULT_TIMEOUT = (10, 30)
+
+mode_lookup = {0: 'minor', 1: 'major'}
+
+# Category orders for the key_name / mode_name / key_mode columns
+key_names = list(pitch_class_lookup.values()) + ['Unknown']
+mode_names = list(mode_lookup.values())
+key_mode_names = [f"{key} {mode}" for key in key_names for mode in mode_names]
@@ -0,0 +1,159 @@
+import json
+import logging
+import sqlite3
+
+from .artist_functions import _related_artists
+from .concurrency import chunked, iter_map
+from .constants import MAX_ARTIST_IDS
+from .entity_store import fetch_missing, get_entity_store
+from .transport import SpotifyAPIError, api_get
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Breadth-first crawl of the related-artists graph from a set of seed artists.
+# Everything lives in a SQLite file: the node table doubles as the visited set, the
+# frontier is read back from it batch_size nodes at a time, and each finished batch
+# is committed. Memory stays bounded however large the graph gets, and an interrupted
+# crawl picks up where it stopped when run again on the same file.
+#
+# Related-artist responses carry full artist objects, so node metadata comes for free
+# for every node except the seeds, which are looked up in /artists batches of 50.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _lookup_artists(ids, access_token, max_workers=None):
+    # Like artist_functions._iter_artists, but a lone id also goes out in the ?ids= form,
+    # so an unknown id comes back as null instead of raising a 400/404
+    def request(chunk):
+        return api_get('/artists', access_token, params={'ids': ','.join(chunk)}, error="Failed to get artist info")['artists']
+    for artists in iter_map(lambda chunk: fetch_missing('artists', chunk, request), chunked(ids, MAX_ARTIST_IDS), max_workers):
+        yield from artists
+
+
+class CrawlStore:
+    def __init__(self, path='spotify_crawl.sqlite'):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS nodes (artist_id TEXT PRIMARY KEY, depth INTEGER, expanded INTEGER DEFAULT 0, '
+                'artist_name TEXT, genres TEXT, popularity INTEGER, followers_total INTEGER)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS nodes_frontier ON nodes (expanded, depth)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS edges (source_id TEXT, target_id TEXT, rank INTEGER, PRIMARY KEY (source_id, target_id))'
+            )
+
+    def node_count(self):
+        return self._conn.execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+
+    def add_nodes(self, ids, depth):
+        # Ids already in the table keep their (smaller or equal) depth; returns how many were new
+        before = self._conn.total_changes
+        self._conn.executemany('INSERT OR IGNORE INTO nodes (artist_id, depth) VALUES (?, ?)', [(id, depth) for id in ids])
+        return self._conn.total_changes - before
+
+    def frontier(self, max_depth, limit):
+        # The shallowest unexpanded nodes, so the crawl stays breadth-first across batches
+        return self._conn.execute(
+            'SELECT artist_id, depth FROM nodes WHERE expanded = 0 AND depth < ? ORDER BY depth, rowid LIMIT ?',
+            (max_depth, limit)
+        ).fetchall()
+
+    def save_metadata(self, artists):
+        self._conn.executemany(
+            'UPDATE nodes SET artist_name = ?, genres = ?, popularity = ?, followers_total = ? WHERE artist_id = ?',
+            [(artist['name'], json.dumps(artist['genres']), artist['popularity'], artist['followers']['total'], artist['id'])
+             for artist in artists]
+        )
+
+    def save_expansion(self, artist_id, related):
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO edges VALUES (?, ?, ?)',
+            [(artist_id, artist['id'], rank) for rank, artist in enumerate(related)]
+        )
+        self._conn.execute('UPDATE nodes SET expanded = 1 WHERE artist_id = ?', (artist_id,))
+
+    def missing_metadata(self, limit):
+        return [row[0] for row in self._conn.execute('SELECT artist_id FROM nodes WHERE artist_name IS NULL LIMIT ?', (limit,))]
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def nodes(self):
+        nodes = pd.read_sql('SELECT artist_id, artist_name, depth, genres, popularity, followers_total FROM nodes ORDER BY rowid', self._conn)
+        nodes['genres'] = [json.loads(genres) if genres else [] for genres in nodes['genres']]
+        nodes['popularity'] = nodes['popularity'].astype('Int64')
+        nodes['followers_total'] = nodes['followers_total'].astype('Int64')
+        return nodes
+
+    def edges(self):
+        return pd.read_sql('SELECT source_id, target_id, rank FROM edges ORDER BY rowid', self._conn)
+
+    def close(self):
+        self._conn.close()
+
+
+def crawl_related_artists(seeds, depth=2, store=None, access_token=None, max_workers=None, batch_size=DEFAULT_BATCH_SIZE, max_nodes=None):
+    # Expands every artist up to `depth` hops from the seeds and returns (nodes, edges):
+    # one row per artist reached, with its hop count and metadata, and one row per
+    # related-artists link in Spotify's rank order. With max_nodes, no new nodes are
+    # added once the graph holds that many; nodes already queued are still expanded, so
+    # their edges may point at artists outside the node table.
+    store = store or CrawlStore()
+    store.add_nodes(seeds, 0)
+    store.commit()
+    entity_store = get_entity_store()
+
+    def expand(node):
+        artist_id, node_depth = node
+        try:
+            return artist_id, node_depth, _related_artists(artist_id, access_token)
+        except SpotifyAPIError as e:
+            if e.status_code not in (400, 404):
+                raise
+            # Unknown or removed artist; keep it as a leaf rather than retrying forever
+            logger.warning("%s", e)
+            return artist_id, node_depth, []
+
+    try:
+        node_count = store.node_count()
+        while True:
+            frontier = store.frontier(depth, batch_size)
+            if not frontier:
+                break
+            for artist_id, node_depth, related in iter_map(expand, frontier, max_workers):
+                if max_nodes is None or node_count < max_nodes:
+                    new = related if max_nodes is None else related[:max_nodes - node_count]
+                    node_count += store.add_nodes([artist['id'] for artist in new], node_depth + 1)
+                store.save_metadata(related)
+                store.save_expansion(artist_id, related)
+                if entity_store is not None:
+                    entity_store.put_many('artists', related)
+            # Checkpoint: a crash from here on repeats at most the next batch
+            store.commit()
+
+        # Seeds (and any node only ever seen as an id) get metadata from batched lookups
+        while True:
+            ids = store.missing_metadata(batch_size)
+            if not ids:
+                break
+            artists = [artist for artist in _lookup_artists(ids, access_token, max_workers) if artist]
+            store.save_metadata(artists)
+            # Ids Spotify does not know get a placeholder so they are not looked up again
+            found = {artist['id'] for artist in artists}
+            store.save_metadata([{'id': id, 'name': '', 'genres': [], 'popularity': None, 'followers': {'total': None}} for id in ids if id not in found])
+            store.commit()
+    except BaseException:
+        # Drop the unfinished batch; the next run starts again from the last checkpoint
+        store.rollback()
+        raise
+
+    return store.nodes(), store.edges()
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 20000
+
+# Seconds an object is reused for. Long enough to share artists, albums and features
+# within one job, short enough that a long-running process does not keep serving
+# popularity and follower counts that are hours old; the response cache (with its
+# per-endpoint TTLs) is the place for reuse across jobs.
+DEFAULT_TTL = 600
+
+
+class EntityStore:
+    # In-memory, id-keyed store of Spotify objects ('artists', 'albums', 'audio_features', ...).
+    # Each kind is its own LRU capped at max_entries, so memory stays bounded on long jobs.
+    # Objects expire ttl seconds after they were stored; ttl=None keeps them until evicted.
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._kinds = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, kind, ids):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            entries = self._kinds.get(kind)
+            if entries is None:
+                return found
+            for id in ids:
+                entry = entries.get(id)
+                if entry is None:
+                    continue
+                obj, stored_at = entry
+                if self.ttl is not None and now - stored_at >= self.ttl:
+                    del entries[id]
+                    continue
+                entries.move_to_end(id)
+                found[id] = obj
+        return found
+
+    def put_many(self, kind, objects):
+        with self._lock:
+            entries = self._kinds.setdefault(kind, OrderedDict())
+            now = time.monotonic()
+            for obj in objects:
+                entries[obj['id']] = (obj, now)
+                entries.move_to_end(obj['id'])
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def sizes(self):
+        with self._lock:
+            return {kind: len(entries) for kind, entries in self._kinds.items()}
+
+    def clear(self, kind=None):
+        with self._lock:
+            if kind is None:
+                self._kinds.clear()
+            else:
+                self._kinds.pop(kind, None)
+
+
+def _split(store, kind, ids):
+    found = store.get_many(kind, ids)
+    missing = [id for id in dict.fromkeys(ids) if id not in found]
+    return found, missing
+
+
+def _merge(store, kind, ids, found, missing, fetched):
+    # Batch endpoints answer in request order, with null for unknown ids
+    store.put_many(kind, [obj for obj in fetched if obj])
+    found.update(zip(missing, fetched))
+    return [found.get(id) for id in ids]
+
+
+def fetch_missing(kind, ids, fetch):
+    # Objects for ids in input order; fetch(missing_ids) is only called for ids the
+    # store does not hold yet, and each distinct id is requested once
+    store = get_entity_store()
+    if store is None:
+        return fetch(ids)
+    found, missing = _split(store, kind, ids)
+    fetched = fetch(missing) if missing else []
+    return _merge(store, kind, ids, found, missing, fetched)
+
+
+async def fetch_missing_async(kind, ids, fetch):
+    store = get_entity_store()
+    if store is None:
+        return await fetch(ids)
+    found, missing = _split(store, kind, ids)
+    fetched = await fetch(missing) if missing else []
+    return _merge(store, kind, ids, found, missing, fetched)
+
+
+_store = EntityStore()
+
+
+def get_entity_store():
+    return _store
+
+
+def set_entity_store(store=None):
+    # None turns entity reuse off; every call then goes to the API (or response cache)
+    global _store
+    _store = store
@@ -0,0 +1,180 @@
+from itertools import islice
+
+from .album_functions import _iter_album_track_items, _iter_artist_album_items, iter_albums, iter_track_audio_features
+from .artist_functions import _iter_artist_items, iter_artist_projects
+
+# Writers that stream results to Parquet or Arrow IPC files in batches as pages arrive,
+# without building a DataFrame first. Columns keep the names of the matching get_*
+# DataFrame but are typed: multi-artist fields are lists instead of comma-joined strings,
+# genres are a list of categories, and counts and flags are ints and bools.
+#
+# Needs pyarrow (`pip install spotipy_gato365[parquet]`).
+
+DEFAULT_BATCH_SIZE = 10000
+
+FORMATS = ('parquet', 'arrow')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("spotipy_gato365.export requires pyarrow; install it with `pip install pyarrow`") from None
+    return pyarrow
+
+
+def _schemas(pa):
+    category = pa.dictionary(pa.int32(), pa.string())
+    names = pa.list_(pa.string())
+    return {
+        'tracks': pa.schema([
+            ('track_id', pa.string()), ('track_name', pa.string()), ('disc_number', pa.int32()),
+            ('duration_ms', pa.int32()), ('explicit', pa.bool_()), ('popularity', pa.int16()),
+            ('artist_id', names), ('artist_name', names), ('album_id', pa.string()),
+        ]),
+        'albums': pa.schema([
+            ('album_id', pa.string()), ('label', pa.string()), ('album_name', pa.string()),
+            ('artist_id', pa.string()), ('artist_name', pa.string()), ('release_date', pa.string()),
+            ('total_tracks', pa.int32()), ('album_type', category), ('popularity', pa.int16()),
+        ]),
+        'artist_albums': pa.schema([
+            ('album_type', category), ('album_id', pa.string()), ('album_name', pa.string()),
+            ('release_date', pa.string()), ('total_tracks', pa.int32()), ('artist_id', names), ('artist_name', names),
+        ]),
+        'projects': pa.schema([
+            ('album_id', pa.string()), ('album_name', pa.string()), ('release_date', pa.string()),
+            ('release_date_precision', category),
+        ]),
+        'artists': pa.schema([
+            ('artist_id', pa.string()), ('artist_name', pa.string()), ('genres', pa.list_(category)),
+            ('popularity', pa.int16()), ('type', category), ('followers_total', pa.int64()),
+        ]),
+        'audio_features': pa.schema([
+            ('danceability', pa.float64()), ('energy', pa.float64()), ('key', pa.int8()),
+            ('loudness', pa.float64()), ('mode', pa.int8()), ('speechiness', pa.float64()),
+            ('acousticness', pa.float64()), ('instrumentalness', pa.float64()), ('liveness', pa.float64()),
+            ('valence', pa.float64()), ('tempo', pa.float64()), ('track_id', pa.string()),
+            ('duration_ms', pa.int32()), ('time_signature', pa.int8()),
+        ]),
+    }
+
+
+def _track_row(item):
+    track, album_id = item
+    return (
+        track['id'], track['name'], track['disc_number'], track['duration_ms'], track['explicit'],
+        track.get('popularity'), [artist['id'] for artist in track['artists']],
+        [artist['name'] for artist in track['artists']], album_id
+    )
+
+
+def _artist_album_row(album):
+    return (
+        album['album_type'], album['id'], album['name'], album['release_date'], album['total_tracks'],
+        [artist['id'] for artist in album['artists']], [artist['name'] for artist in album['artists']]
+    )
+
+
+def _artist_row(artist):
+    return (
+        artist['id'], artist['name'], artist['genres'], artist['popularity'], artist['type'],
+        artist['followers']['total']
+    )
+
+
+class _Categories:
+    # Dictionary columns are encoded against one vocabulary per column that only ever
+    # grows, so each batch's dictionary extends the previous one. Arrow IPC files accept
+    # that as a delta; a fresh dictionary per batch would be rejected as a replacement.
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values):
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            codes.append(code)
+        return codes
+
+
+def _column(pa, values, type, categories):
+    if pa.types.is_dictionary(type):
+        codes = categories.encode(values)
+        return pa.DictionaryArray.from_arrays(pa.array(codes, type.index_type), pa.array(categories.values, type.value_type))
+    if pa.types.is_list(type) and pa.types.is_dictionary(type.value_type):
+        offsets = [0]
+        for value in values:
+            offsets.append(offsets[-1] + len(value))
+        flat = _column(pa, [item for value in values for item in value], type.value_type, categories)
+        return pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), flat)
+    return pa.array(values, type)
+
+
+def _open_writer(pa, path, schema, format):
+    if format == 'parquet':
+        return pa.parquet.ParquetWriter(path, schema)
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    return pa.ipc.new_file(path, schema, options=options)
+
+
+def write_rows(rows, kind, path, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    # Writes tuples in the column order of schema `kind`, batch_size rows at a time, and
+    # returns how many were written. Only one batch is held in memory at once.
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, not {format!r}")
+    pa = _pyarrow()
+    schema = _schemas(pa)[kind]
+    categories = {field.name: _Categories() for field in schema}
+    rows = iter(rows)
+    written = 0
+    with _open_writer(pa, path, schema, format) as writer:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            columns = [
+                _column(pa, list(values), field.type, categories[field.name])
+                for field, values in zip(schema, zip(*batch))
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            written += len(batch)
+    return written
+
+
+def export_track_audio_features(path, queries=None, ids=None, access_token=None, max_workers=None, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    rows = iter_track_audio_features(queries, ids, access_token, max_workers)
+    return write_rows(rows, 'audio_features', path, format, batch_size)
+
+
+def export_albums(path, queries=None, ids=None, access_token=None, max_workers=None, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    rows = iter_albums(queries, ids, access_token, max_workers)
+    return write_rows(rows, 'albums', path, format, batch_size)
+
+
+def export_album_tracks(path, query=None, ids=None, access_token=None, limit=None, offset=0, max_workers=None, prefetch=False, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    items = _iter_album_track_items(query, ids, access_token, limit, offset, max_workers, prefetch)
+    return write_rows(map(_track_row, items), 'tracks', path, format, batch_size)
+
+
+def export_artist_albums(path, query=None, id=None, limit=None, offset=0, access_token=None, prefetch=False, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    albums = _iter_artist_album_items(query, id, limit, offset, access_token, prefetch)
+    return write_rows(map(_artist_album_row, albums), 'artist_albums', path, format, batch_size)
+
+
+def export_artists(path, queries=None, ids=None, access_token=None, max_workers=None, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    artists = _iter_artist_items(queries, ids, access_token, max_workers)
+    return write_rows(map(_artist_row, artists), 'artists', path, format, batch_size)
+
+
+def export_artist_projects(path, query=None, id=None, access_token=None, limit=None, offset=0, prefetch=False, format='parquet', batch_size=DEFAULT_BATCH_SIZE):
+    rows = iter_artist_projects(query, id, access_token, limit, offset, prefetch)
+    return write_rows(rows, 'projects', path, format, batch_size)
@@ -0,0 +1,231 @@
+import json
+import os
+
+from .album_functions import get_track_audio_features
+from ._lazy import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+# On-disk index of audio-feature vectors for nearest-track lookups. Vectors are float32
+# rows of one contiguous array memory-mapped from `<path>.npy`, so only the pages a
+# query touches are read, and queries scan it in blocks to keep memory flat.
+#
+#     index = FeatureIndex('features')
+#     index.add(get_track_audio_features(ids=track_ids))
+#     index.knn(['track id'], k=10)
+#
+# Every feature is scaled by a fixed range rather than by statistics of the data, so
+# vectors already stored stay comparable with ones added later.
+
+# Feature -> (low, high); values are mapped onto 0..1 and clipped
+FEATURE_RANGES = {
+    'danceability': (0.0, 1.0),
+    'energy': (0.0, 1.0),
+    'loudness': (-60.0, 0.0),
+    'speechiness': (0.0, 1.0),
+    'acousticness': (0.0, 1.0),
+    'instrumentalness': (0.0, 1.0),
+    'liveness': (0.0, 1.0),
+    'valence': (0.0, 1.0),
+    'tempo': (0.0, 250.0),
+}
+
+# Index rows and queries compared per step of a scan; a step's distance matrix holds
+# BLOCK_SIZE * QUERY_BLOCK_SIZE floats (32 MB)
+BLOCK_SIZE = 16384
+QUERY_BLOCK_SIZE = 512
+
+
+class FeatureIndex:
+    def __init__(self, path='spotify_features', features=None, weights=None, capacity=1024):
+        self.path = path
+        meta = self._read_meta()
+        if meta is not None:
+            self.features = meta['features']
+            self.weights = meta['weights']
+            self.count = meta['count']
+            self._vectors = np.lib.format.open_memmap(path + '.npy', mode='r+')
+            with open(path + '.ids') as f:
+                ids = f.read().split()
+            self.ids = ids[:self.count]
+            if len(ids) > self.count:
+                # Ids appended by an add that crashed before its metadata was written;
+                # dropped so the next add's ids line up with their rows again
+                self._write_ids()
+        else:
+            self.features = list(features or FEATURE_RANGES)
+            self.weights = [float(w) for w in weights] if weights is not None else [1.0] * len(self.features)
+            self.count = 0
+            self._vectors = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype='float32', shape=(capacity, len(self.features)))
+            self.ids = []
+            open(path + '.ids', 'w').close()
+            self._write_meta()
+        self._rows = {id: row for row, id in enumerate(self.ids)}
+        low, high = zip(*(FEATURE_RANGES[feature] for feature in self.features))
+        self._low = np.array(low, dtype='float32')
+        self._span = np.array(high, dtype='float32') - self._low
+        self._weights = np.array(self.weights, dtype='float32')
+
+    def _read_meta(self):
+        if not os.path.exists(self.path + '.json'):
+            return None
+        with open(self.path + '.json') as f:
+            return json.load(f)
+
+    def _write_ids(self):
+        tmp = self.path + '.ids.tmp'
+        with open(tmp, 'w') as f:
+            f.writelines(id + '\n' for id in self.ids)
+        os.replace(tmp, self.path + '.ids')
+
+    def _write_meta(self):
+        # Written last, so a crash mid-add leaves the previous count in force: rows and
+        # ids past it are ignored, and the ids trimmed on the next open. Vectors replaced
+        # in place for tracks already indexed may keep their new values.
+        tmp = self.path + '.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'features': self.features, 'weights': self.weights, 'count': self.count}, f)
+        os.replace(tmp, self.path + '.json')
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, track_id):
+        return track_id in self._rows
+
+    def normalize(self, values):
+        # Raw feature values (rows in self.features order) -> stored vectors
+        values = np.asarray(values, dtype='float32')
+        return np.clip((values - self._low) / self._span, 0, 1) * self._weights
+
+    def _grow(self, needed):
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        tmp = self.path + '.npy.tmp'
+        grown = np.lib.format.open_memmap(tmp, mode='w+', dtype='float32', shape=(capacity, len(self.features)))
+        grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        del self._vectors
+        os.replace(tmp, self.path + '.npy')
+        self._vectors = np.lib.format.open_memmap(self.path + '.npy', mode='r+')
+
+    def add(self, features):
+        # Adds or replaces the vectors of a get_track_audio_features frame. Tracks with
+        # missing values are skipped. Returns how many new tracks were added.
+        features = features.dropna(subset=self.features).drop_duplicates('track_id', keep='last')
+        vectors = self.normalize(features[self.features].to_numpy())
+        ids = features['track_id'].tolist()
+
+        existing = [self._rows.get(id) for id in ids]
+        replace = [i for i, row in enumerate(existing) if row is not None]
+        if replace:
+            self._vectors[[existing[i] for i in replace]] = vectors[replace]
+        new = [i for i, row in enumerate(existing) if row is None]
+        if new:
+            self._grow(self.count + len(new))
+            self._vectors[self.count:self.count + len(new)] = vectors[new]
+            with open(self.path + '.ids', 'a') as f:
+                f.writelines(ids[i] + '\n' for i in new)
+            for offset, i in enumerate(new):
+                self._rows[ids[i]] = self.count + offset
+                self.ids.append(ids[i])
+            self.count += len(new)
+        self._vectors.flush()
+        self._write_meta()
+        return len(new)
+
+    def update(self, track_ids, access_token=None, max_workers=None):
+        # Fetches and adds features for the track ids not indexed yet
+        missing = [id for id in dict.fromkeys(track_ids) if id not in self._rows]
+        if not missing:
+            return 0
+        return self.add(get_track_audio_features(ids=missing, access_token=access_token, max_workers=max_workers))
+
+    def vectors(self, track_ids):
+        rows = [self._rows[id] for id in track_ids]
+        return np.asarray(self._vectors[rows])
+
+    def _queries(self, queries):
+        # Track ids or raw feature rows -> (labels, normalized query matrix)
+        if isinstance(queries, str):
+            queries = [queries]
+        if isinstance(queries, pd.DataFrame):
+            return queries['track_id'].tolist(), self.normalize(queries[self.features].to_numpy())
+        queries = list(queries)
+        if queries and isinstance(queries[0], str):
+            return queries, self.vectors(queries)
+        return list(range(len(queries))), self.normalize(queries)
+
+    def _blocks(self):
+        for start in range(0, self.count, BLOCK_SIZE):
+            block = np.asarray(self._vectors[start:min(start + BLOCK_SIZE, self.count)])
+            yield start, block, np.einsum('ij,ij->i', block, block)
+
+    def knn(self, queries, k=10, exclude_self=True):
+        # The k nearest tracks (Euclidean distance on normalized vectors) to each query.
+        # queries: track ids in the index, a features frame, or raw feature rows.
+        # Returns query, track_id, distance and rank columns, nearest first.
+        labels, matrix = self._queries(queries)
+        records = []
+        for start in range(0, len(labels), QUERY_BLOCK_SIZE):
+            block_labels = labels[start:start + QUERY_BLOCK_SIZE]
+            rows, dists = self._nearest(matrix[start:start + QUERY_BLOCK_SIZE], k + 1 if exclude_self else k)
+            for label, label_rows, label_dists in zip(block_labels, rows, dists):
+                rank = 0
+                for row, dist in zip(label_rows, label_dists):
+                    track_id = self.ids[row]
+                    if exclude_self and track_id == label:
+                        continue
+                    if rank == k:
+                        break
+                    rank += 1
+                    records.append((label, track_id, float(dist), rank))
+        return pd.DataFrame.from_records(records, columns=['query', 'track_id', 'distance', 'rank'])
+
+    def _nearest(self, matrix, keep):
+        # Rows and distances of the `keep` nearest vectors to each query row, nearest first.
+        # Only the running best `keep` per query survive each block.
+        keep = min(keep, self.count)
+        query_norms = np.einsum('ij,ij->i', matrix, matrix)
+        best_rows = np.empty((len(matrix), 0), dtype='int64')
+        best_dist = np.empty((len(matrix), 0), dtype='float32')
+        for start, block, block_norms in self._blocks():
+            dist = query_norms[:, None] - 2 * matrix @ block.T + block_norms[None, :]
+            rows = np.broadcast_to(np.arange(start, start + len(block)), dist.shape)
+            dist = np.concatenate([best_dist, dist], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if dist.shape[1] > keep:
+                top = np.argpartition(dist, keep - 1, axis=1)[:, :keep]
+                dist = np.take_along_axis(dist, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_dist, best_rows = dist, rows
+        order = np.argsort(best_dist, axis=1)
+        best_dist = np.sqrt(np.maximum(np.take_along_axis(best_dist, order, axis=1), 0))
+        return np.take_along_axis(best_rows, order, axis=1), best_dist
+
+    def within(self, queries, radius):
+        # Every indexed track within `radius` of each query, nearest first, queries in
+        # input order
+        labels, matrix = self._queries(queries)
+        frames = []
+        for query_start in range(0, len(labels), QUERY_BLOCK_SIZE):
+            queries = matrix[query_start:query_start + QUERY_BLOCK_SIZE]
+            query_norms = np.einsum('ij,ij->i', queries, queries)
+            for start, block, block_norms in self._blocks():
+                dist = query_norms[:, None] - 2 * queries @ block.T + block_norms[None, :]
+                query_index, rows = np.nonzero(dist <= radius * radius)
+                frames.append(pd.DataFrame({
+                    'position': query_start + query_index,
+                    'track_id': [self.ids[start + row] for row in rows],
+                    'distance': np.sqrt(np.maximum(dist[query_index, rows], 0)),
+                }))
+        if not frames:
+            return pd.DataFrame(columns=['query', 'track_id', 'distance'])
+        result = pd.concat(frames, ignore_index=True).sort_values(['position', 'distance'], kind='stable')
+        result.insert(0, 'query', [labels[i] for i in result['position']])
+        return result.drop(columns='position').reset_index(drop=True)
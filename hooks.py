@@ -0,0 +1,257 @@
+import bisect
+import json
+import logging
+import threading
+import time
+
+# Callbacks around every request the package makes, blocking or async.
+#
+#     add_hook('after', lambda event: print(event.endpoint, event.status, event.latency))
+#
+# 'before' fires as an HTTP attempt starts and 'after' once its response arrived, so a
+# request retried after a 429 shows up once per attempt. A response served from the
+# response cache fires 'before' and 'after' too, with cache='hit' and no latency.
+# 'error' fires when an attempt raised (connection errors, timeouts) or when a request
+# failed for good with SpotifyAPIError. All three receive the same RequestEvent.
+#
+# A hook that raises is logged and otherwise ignored; observing a request never
+# changes its outcome.
+
+EVENTS = ('before', 'after', 'error')
+
+logger = logging.getLogger(__name__)
+
+_hooks = {event: () for event in EVENTS}
+_lock = threading.Lock()
+
+
+class RequestEvent:
+    # cache is None when no response cache is installed, otherwise 'hit' (served from
+    # the cache), 'miss' (nothing stored) or 'stale' (stored copy sent for revalidation;
+    # a 304 status means it was still current)
+    __slots__ = ('method', 'endpoint', 'url', 'params', 'attempt', 'cache', 'status', 'latency', 'size', 'error')
+
+    def __init__(self, method, endpoint, url, params=None, attempt=1, cache=None):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.params = params
+        self.attempt = attempt
+        self.cache = cache
+        self.status = None
+        self.latency = None
+        self.size = None
+        self.error = None
+
+    def as_dict(self):
+        record = {name: getattr(self, name) for name in self.__slots__}
+        record['error'] = str(self.error) if self.error is not None else None
+        return record
+
+
+def add_hook(event, callback):
+    if event not in EVENTS:
+        raise ValueError(f"event must be one of {EVENTS}, not {event!r}")
+    with _lock:
+        _hooks[event] = _hooks[event] + (callback,)
+
+
+def remove_hook(event, callback):
+    with _lock:
+        _hooks[event] = tuple(hook for hook in _hooks[event] if hook != callback)
+
+
+def clear_hooks():
+    with _lock:
+        for event in EVENTS:
+            _hooks[event] = ()
+
+
+def has_hooks():
+    return any(_hooks.values())
+
+
+def emit(event, request_event):
+    for hook in _hooks[event]:
+        try:
+            hook(request_event)
+        except Exception:
+            logger.exception("%s hook %r failed", event, hook)
+
+
+def _finish(event, started, response):
+    event.latency = time.perf_counter() - started
+    event.status = response.status_code
+    event.size = len(response.content)
+    emit('after', event)
+    return response
+
+
+def _fail(event, started, error):
+    event.latency = time.perf_counter() - started
+    event.error = error
+    emit('error', event)
+
+
+def observe(request, method, endpoint, url, params=None, cache=None):
+    # Wraps a zero-argument request callable (as handed to RequestScheduler.send) so
+    # each attempt emits events. Without hooks the request runs unobserved.
+    attempts = [0]
+
+    def observed():
+        attempts[0] += 1
+        if not has_hooks():
+            return request()
+        event = RequestEvent(method, endpoint, url, params, attempts[0], cache)
+        emit('before', event)
+        started = time.perf_counter()
+        try:
+            response = request()
+        except Exception as e:
+            _fail(event, started, e)
+            raise
+        return _finish(event, started, response)
+    return observed
+
+
+def observe_async(request, method, endpoint, url, params=None, cache=None):
+    attempts = [0]
+
+    async def observed():
+        attempts[0] += 1
+        if not has_hooks():
+            return await request()
+        event = RequestEvent(method, endpoint, url, params, attempts[0], cache)
+        emit('before', event)
+        started = time.perf_counter()
+        try:
+            response = await request()
+        except Exception as e:
+            _fail(event, started, e)
+            raise
+        return _finish(event, started, response)
+    return observed
+
+
+def cache_hit(method, endpoint, url, params=None):
+    if has_hooks():
+        event = RequestEvent(method, endpoint, url, params, 0, 'hit')
+        event.status = 200
+        event.latency = 0.0
+        emit('before', event)
+        emit('after', event)
+
+
+def request_failed(method, endpoint, url, params, error):
+    if has_hooks():
+        event = RequestEvent(method, endpoint, url, params)
+        event.status = getattr(error, 'status_code', None)
+        event.error = error
+        emit('error', event)
+
+
+# Latency bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+
+class EndpointHistogram:
+    # Per-endpoint request, status, byte and cache counts plus a latency histogram.
+    # attach() starts collecting, detach() stops.
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = {
+                'requests': 0, 'errors': 0, 'bytes': 0, 'latency_total': 0.0, 'latency_max': 0.0,
+                'cache': {}, 'status': {}, 'latency_buckets': [0] * len(self.buckets),
+            }
+        return stats
+
+    def after(self, event):
+        with self._lock:
+            stats = self._endpoint(event.endpoint)
+            stats['requests'] += 1
+            stats['status'][event.status] = stats['status'].get(event.status, 0) + 1
+            if event.cache is not None:
+                stats['cache'][event.cache] = stats['cache'].get(event.cache, 0) + 1
+            if event.cache == 'hit':
+                return
+            stats['bytes'] += event.size or 0
+            stats['latency_total'] += event.latency
+            stats['latency_max'] = max(stats['latency_max'], event.latency)
+            stats['latency_buckets'][bisect.bisect_left(self.buckets, event.latency)] += 1
+
+    def error(self, event):
+        with self._lock:
+            self._endpoint(event.endpoint)['errors'] += 1
+
+    def attach(self):
+        add_hook('after', self.after)
+        add_hook('error', self.error)
+        return self
+
+    def detach(self):
+        remove_hook('after', self.after)
+        remove_hook('error', self.error)
+
+    def percentile(self, endpoint, q):
+        # Upper bound of the bucket holding the q-th percentile (0-100) of latencies
+        with self._lock:
+            counts = list(self._stats[endpoint]['latency_buckets'])
+        total = sum(counts)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= total * q / 100:
+                return bound
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                endpoint: dict(stats, cache=dict(stats['cache']), status=dict(stats['status']),
+                               latency_buckets=list(stats['latency_buckets']))
+                for endpoint, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class LoggingSink:
+    # Writes one JSON object per event to a logger, for log pipelines that parse
+    # structured lines. Errors are logged at WARNING, everything else at `level`.
+    def __init__(self, logger=None, level=logging.DEBUG, events=('after', 'error')):
+        self.logger = logger or logging.getLogger('spotipy_gato365.requests')
+        self.level = level
+        self.events = events
+
+    def _log(self, name, event):
+        record = event.as_dict()
+        record['event'] = name
+        level = logging.WARNING if name == 'error' else self.level
+        self.logger.log(level, json.dumps(record, default=str))
+
+    def before(self, event):
+        self._log('before', event)
+
+    def after(self, event):
+        self._log('after', event)
+
+    def error(self, event):
+        self._log('error', event)
+
+    def attach(self):
+        for name in self.events:
+            add_hook(name, getattr(self, name))
+        return self
+
+    def detach(self):
+        for name in self.events:
+            remove_hook(name, getattr(self, name))
@@ -0,0 +1,302 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.managers import BaseManager
+
+from .album_functions import get_album_track_features
+from .artist_functions import get_artist_audio_features
+from .authorize import TokenProvider
+from .cache import ResponseCache, get_cache, set_cache
+from .compact import compact_frame
+from .concurrency import chunked, get_max_workers, set_max_workers
+from .constants import MAX_ALBUM_IDS
+from .entity_store import EntityStore, fetch_missing, set_entity_store
+from .scheduler import RequestScheduler, TokenBucket, set_scheduler
+from .transport import SpotifyAPIError, api_get, get_timeout, get_urls, set_session, set_timeout
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Catalog-scale extraction spread over worker processes:
+#
+#     python -m spotipy_gato365.jobs artist artist_ids.txt --out job --processes 8 --rate 20
+#     run_job('album', album_ids, 'job', processes=8, rate=20)
+#
+# The ids are cut into shards of shard_size. Each worker process opens its own pooled
+# session and threads, and takes request tokens from one TokenBucket held by a local
+# coordinator process, so `rate` (and any Retry-After pause) applies to the whole job
+# rather than to each process. A finished shard is written to its own file and then
+# recorded in the job's manifest; running the same job on the same directory again
+# skips recorded shards, so a crash costs at most the shards that were in flight.
+# Once every shard is in, they are merged into one result file.
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('artist', 'album')
+FORMATS = {'pickle': 'pkl', 'parquet': 'parquet'}
+DEFAULT_SHARD_SIZE = 50
+
+
+class _Coordinator(BaseManager):
+    pass
+
+
+_Coordinator.register('TokenBucket', TokenBucket, exposed=('_take', 'pause'))
+
+
+class _SharedBucket(TokenBucket):
+    # TokenBucket whose tokens live in the coordinator; waiting happens in the worker
+    def __init__(self, proxy):
+        self._proxy = proxy
+
+    def _take(self):
+        return self._proxy._take()
+
+    def pause(self, seconds):
+        self._proxy.pause(seconds)
+
+
+# Per-worker state set up by _init_worker
+_worker_token = None
+
+
+def _init_worker(bucket, base_url, auth_url, timeout, cache_options, max_workers, token):
+    # Nothing holding a socket, SQLite connection or lock is shared with the parent
+    global _worker_token
+    set_session(base_url=base_url, auth_url=auth_url)
+    set_timeout(timeout)
+    scheduler = RequestScheduler()
+    scheduler.bucket = _SharedBucket(bucket) if bucket is not None else None
+    set_scheduler(scheduler)
+    set_cache(ResponseCache(**cache_options) if cache_options else None)
+    set_entity_store(EntityStore())
+    set_max_workers(max_workers)
+    _worker_token = TokenProvider(*token) if isinstance(token, tuple) else token
+
+
+def _worker_args(access_token, max_workers):
+    # What a worker needs to rebuild the parent's client setup. TokenProviders hold a
+    # lock and a cached token, so each worker gets a provider of its own.
+    cache = get_cache()
+    cache_options = None
+    if isinstance(cache, ResponseCache):
+        cache_options = {'path': cache.path, 'ttl': cache.ttl, 'default_ttl': cache.default_ttl,
+                         'max_entries': cache.max_entries, 'offline': cache.offline}
+    if isinstance(access_token, TokenProvider):
+        access_token = (access_token.client_id, access_token.client_secret)
+    return get_urls() + (get_timeout(), cache_options, max_workers or get_max_workers(), access_token)
+
+
+def _album_lookup(ids):
+    # Album objects (None for unknown ids) in input order. The ?ids= form is used even
+    # for a lone id, so an unknown id comes back as null rather than as a 400/404, and
+    # the albums found land in the entity store for the extraction that follows.
+    def request(chunk):
+        return api_get('/albums', _worker_token, params={'ids': ','.join(chunk), 'market': 'US'}, error="Failed to get album info")['albums']
+    return [album for chunk in chunked(ids, MAX_ALBUM_IDS) for album in fetch_missing('albums', chunk, request)]
+
+
+def _extract(kind, ids, compact):
+    # (frame, skipped ids) for one shard
+    if kind == 'album':
+        albums = _album_lookup(ids)
+        found = [id for id, album in zip(ids, albums) if album]
+        skipped = [id for id, album in zip(ids, albums) if not album]
+        for id in skipped:
+            logger.warning("%s: album not found", id)
+        if not found:
+            return pd.DataFrame(), skipped
+        return get_album_track_features(ids=found, access_token=_worker_token, compact=compact), skipped
+    frames, skipped = [], []
+    for id in ids:
+        try:
+            frames.append(get_artist_audio_features(id=id, access_token=_worker_token, compact=compact))
+        except ValueError as e:
+            # Unknown artist or one without releases
+            logger.warning("%s: %s", id, e)
+            skipped.append(id)
+        except SpotifyAPIError as e:
+            if e.status_code not in (400, 404):
+                raise
+            logger.warning("%s", e)
+            skipped.append(id)
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), skipped
+
+
+def _write_frame(frame, path, format):
+    # Written under a temporary name first, so a file that exists is complete
+    tmp = path + '.tmp'
+    if format == 'parquet':
+        frame.to_parquet(tmp, index=False)
+    else:
+        frame.to_pickle(tmp, compression=None)
+    os.replace(tmp, path)
+
+
+def _read_frame(path, format):
+    return pd.read_parquet(path) if format == 'parquet' else pd.read_pickle(path, compression=None)
+
+
+def _run_shard(kind, index, ids, path, format, compact):
+    frame, skipped = _extract(kind, ids, compact)
+    _write_frame(frame, path, format)
+    return index, len(frame), skipped
+
+
+class ShardedJob:
+    # The on-disk layout of one job: job.json (what is being extracted), manifest.jsonl
+    # (one line per finished shard), shard-NNNNN.<ext> and result.<ext>
+    def __init__(self, directory, kind, ids, shard_size=DEFAULT_SHARD_SIZE, format='pickle', compact=False):
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, not {kind!r}")
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {tuple(FORMATS)}, not {format!r}")
+        self.directory = directory
+        self.kind = kind
+        self.format = format
+        self.compact = compact
+        self.shards = chunked(dict.fromkeys(ids), shard_size)
+        digest = hashlib.sha1('\n'.join(id for shard in self.shards for id in shard).encode()).hexdigest()
+        self.spec = {'kind': kind, 'format': format, 'shard_size': shard_size, 'shards': len(self.shards), 'ids_sha1': digest,
+                     'compact': compact}
+
+        os.makedirs(directory, exist_ok=True)
+        spec_path = os.path.join(directory, 'job.json')
+        if os.path.exists(spec_path):
+            with open(spec_path) as f:
+                if json.load(f) != self.spec:
+                    raise ValueError(f"{directory} holds a different job; use a new directory to start another")
+        else:
+            with open(spec_path, 'w') as f:
+                json.dump(self.spec, f)
+
+    def shard_path(self, index):
+        return os.path.join(self.directory, f'shard-{index:05d}.{FORMATS[self.format]}')
+
+    @property
+    def result_path(self):
+        return os.path.join(self.directory, f'result.{FORMATS[self.format]}')
+
+    def completed(self):
+        # index -> manifest entry of every finished shard whose file is still there
+        done = {}
+        path = os.path.join(self.directory, 'manifest.jsonl')
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash; its shard is simply run again
+                        continue
+                    if os.path.exists(self.shard_path(entry['shard'])):
+                        done[entry['shard']] = entry
+        return done
+
+    def record(self, index, rows, skipped):
+        with open(os.path.join(self.directory, 'manifest.jsonl'), 'a') as f:
+            f.write(json.dumps({'shard': index, 'rows': rows, 'skipped': skipped}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def merge(self):
+        # Shards in order, as one frame written to result_path
+        frames = [_read_frame(self.shard_path(index), self.format) for index in range(len(self.shards))]
+        frames = [frame for frame in frames if not frame.empty]
+        result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if self.compact:
+            # Shards have categories of their own, which concat turns back into strings
+            result = compact_frame(result)
+        _write_frame(result, self.result_path, self.format)
+        return result
+
+
+def run_job(kind, ids, directory, access_token=None, processes=None, max_workers=None, rate=None, burst=None,
+            shard_size=DEFAULT_SHARD_SIZE, format='pickle', compact=False, merge=True):
+    # kind 'artist' runs get_artist_audio_features per id, 'album' runs
+    # get_album_track_features per shard. Unknown albums, and artists that cannot be
+    # found or have no releases, are skipped and listed in the manifest. Shards that raise are left out of
+    # the manifest and reported once the others are done; run again to retry them.
+    # With compact=True shards and result use compact_frame dtypes. Returns the merged
+    # frame, or None with merge=False.
+    job = ShardedJob(directory, kind, ids, shard_size, format, compact)
+    done = job.completed()
+    pending = [index for index in range(len(job.shards)) if index not in done]
+    logger.info("%s job in %s: %d shards, %d already done", kind, directory, len(job.shards), len(done))
+
+    failed = []
+    if pending:
+        with _Coordinator() as coordinator:
+            bucket = coordinator.TokenBucket(rate, burst) if rate else None
+            initargs = (bucket,) + _worker_args(access_token, max_workers)
+            with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=initargs) as executor:
+                futures = {
+                    executor.submit(_run_shard, kind, index, job.shards[index], job.shard_path(index), format, compact): index
+                    for index in pending
+                }
+                try:
+                    for future in as_completed(futures):
+                        try:
+                            index, rows, skipped = future.result()
+                        except Exception as e:
+                            logger.error("shard %d failed: %s", futures[future], e)
+                            failed.append(futures[future])
+                            continue
+                        job.record(index, rows, skipped)
+                        logger.info("shard %d done: %d rows, %d skipped", index, rows, len(skipped))
+                except BaseException:
+                    # Finished shards are already recorded; drop the ones not started yet
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(job.shards)} shards failed ({sorted(failed)}); run the job again to retry them")
+    return job.merge() if merge else None
+
+
+def _read_ids(path):
+    # One id per line; blank lines and lines starting with # are ignored
+    f = sys.stdin if path == '-' else open(path)
+    try:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m spotipy_gato365.jobs', description='Sharded, resumable extraction across worker processes')
+    parser.add_argument('kind', choices=KINDS, help='artist: get_artist_audio_features, album: get_album_track_features')
+    parser.add_argument('ids', help="file with one id per line, or - for stdin")
+    parser.add_argument('--out', required=True, help='job directory; rerun with the same one to resume')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-workers', type=int, default=None, help='request threads per process')
+    parser.add_argument('--rate', type=float, default=None, help='requests per second across all processes')
+    parser.add_argument('--burst', type=int, default=None)
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='ids per shard')
+    parser.add_argument('--format', choices=tuple(FORMATS), default='pickle')
+    parser.add_argument('--compact', action='store_true', help='store compact dtypes (float32 features, categorical ids)')
+    parser.add_argument('--no-merge', action='store_true', help='leave the shard files unmerged')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    try:
+        result = run_job(
+            args.kind, _read_ids(args.ids), args.out, processes=args.processes, max_workers=args.max_workers,
+            rate=args.rate, burst=args.burst, shard_size=args.shard_size, format=args.format, compact=args.compact,
+            merge=not args.no_merge,
+        )
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if result is not None:
+        print(f"{len(result)} rows written to {os.path.join(args.out, 'result.' + FORMATS[args.format])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
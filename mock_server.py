@@ -0,0 +1,380 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .transport import API_URL
+
+# Local stand-in for the Spotify Web API, for benchmarks and offline runs. Responses
+# are generated on the fly from a synthetic catalog, with the same shape and roughly
+# the same size as the real JSON, so memory and parsing costs are representative.
+# Latency and 429 responses can be injected.
+#
+#     with MockSpotifyServer(MockCatalog(artists=200)) as server:
+#         set_session(base_url=server.api_url, auth_url=server.auth_url)
+#
+# Ids encode their position in the catalog ('a' + artist, 'b' + artist + album,
+# 't' + artist + album + track, each padded to Spotify's 22 characters), so nothing
+# has to be held in memory however large the catalog is.
+
+_ARTIST = re.compile(r'a(\d{21})')
+_ALBUM = re.compile(r'b(\d{11})(\d{10})')
+_TRACK = re.compile(r't(\d{9})(\d{6})(\d{6})')
+
+
+def _artist_id(i):
+    return f'a{i:021d}'
+
+
+def _album_id(i, j):
+    return f'b{i:011d}{j:010d}'
+
+
+def _track_id(i, j, k):
+    return f't{i:09d}{j:06d}{k:06d}'
+
+
+def _unit(*key):
+    # Deterministic pseudo-random number in [0, 1) for a catalog position
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def _links(kind, id):
+    return {
+        'external_urls': {'spotify': f'https://open.spotify.com/{kind}/{id}'},
+        'href': f'{API_URL}/{kind}s/{id}',
+        'uri': f'spotify:{kind}:{id}',
+    }
+
+
+def _images():
+    return [
+        {'url': f'https://i.scdn.co/image/{"0" * 40}', 'height': size, 'width': size}
+        for size in (640, 300, 64)
+    ]
+
+
+class MockCatalog:
+    GENRES = ['pop', 'rock', 'hip hop', 'indie', 'r&b', 'jazz', 'electronic', 'country', 'latin', 'metal']
+
+    def __init__(self, artists=100, albums_per_artist=20, tracks_per_album=12, related=20, seed=0):
+        self.artists = artists
+        self.albums_per_artist = albums_per_artist
+        self.tracks_per_album = tracks_per_album
+        self.related = related
+        self.seed = seed
+
+    def artist_ids(self, count=None):
+        return [_artist_id(i) for i in range(min(count or self.artists, self.artists))]
+
+    def album_ids(self, artist=0):
+        return [_album_id(artist, j) for j in range(self.albums_per_artist)]
+
+    def _artist_ref(self, i):
+        return dict(_links('artist', _artist_id(i)), id=_artist_id(i), name=f'Artist {i}', type='artist')
+
+    def artist(self, i):
+        if not 0 <= i < self.artists:
+            return None
+        genres = [self.GENRES[(i + g) % len(self.GENRES)] for g in range(1 + i % 3)]
+        return dict(
+            self._artist_ref(i),
+            followers={'href': None, 'total': int(_unit(self.seed, 'followers', i) * 10 ** 7)},
+            genres=genres, images=_images(), popularity=int(_unit(self.seed, 'popularity', i) * 100),
+        )
+
+    def _track_count(self, i, j):
+        # Varies around tracks_per_album so some albums need a second page of tracks
+        return max(1, int(self.tracks_per_album * (0.5 + _unit(self.seed, 'tracks', i, j))))
+
+    def _release(self, i, j):
+        year = 1970 + int(_unit(self.seed, 'year', i, j) * 55)
+        if j % 7 == 6:
+            return str(year), 'year'
+        return f'{year}-{1 + j % 12:02d}-{1 + j % 28:02d}', 'day'
+
+    def _simplified_album(self, i, j):
+        release_date, precision = self._release(i, j)
+        album_type = 'single' if j % 4 == 3 else 'album'
+        return dict(
+            _links('album', _album_id(i, j)),
+            album_type=album_type, total_tracks=self._track_count(i, j), available_markets=['US', 'CA', 'GB'],
+            id=_album_id(i, j), images=_images(), name=f'Album {j} by Artist {i}', release_date=release_date,
+            release_date_precision=precision, type='album', artists=[self._artist_ref(i)],
+        )
+
+    def _track(self, i, j, k):
+        artists = [self._artist_ref(i)]
+        if k % 5 == 4:
+            artists.append(self._artist_ref((i + k) % self.artists))
+        return dict(
+            _links('track', _track_id(i, j, k)),
+            artists=artists, available_markets=['US', 'CA', 'GB'], disc_number=1,
+            duration_ms=120000 + int(_unit(self.seed, 'duration', i, j, k) * 240000), explicit=k % 3 == 0,
+            id=_track_id(i, j, k), is_local=False, name=f'Track {k} of Album {j}',
+            preview_url=None, track_number=k + 1, type='track',
+        )
+
+    def tracks(self, i, j):
+        return [self._track(i, j, k) for k in range(self._track_count(i, j))]
+
+    def album(self, i, j):
+        if not (0 <= i < self.artists and 0 <= j < self.albums_per_artist):
+            return None
+        album = self._simplified_album(i, j)
+        album.update(
+            copyrights=[{'text': f'(P) Label {i % 50}', 'type': 'P'}], external_ids={'upc': f'{i:06d}{j:06d}'},
+            genres=[], label=f'Label {i % 50}', popularity=int(_unit(self.seed, 'album_popularity', i, j) * 100),
+            tracks=page(self.tracks(i, j), 0, 50, f'{API_URL}/albums/{_album_id(i, j)}/tracks'),
+        )
+        return album
+
+    def audio_features(self, i, j, k):
+        if not 0 <= i < self.artists:
+            return None
+        unit = lambda name: _unit(self.seed, name, i, j, k)
+        track_id = _track_id(i, j, k)
+        return {
+            'danceability': round(unit('danceability'), 3), 'energy': round(unit('energy'), 3),
+            'key': int(unit('key') * 13) - 1, 'loudness': round(-30 * unit('loudness'), 3),
+            'mode': int(unit('mode') * 2), 'speechiness': round(unit('speechiness') / 3, 4),
+            'acousticness': round(unit('acousticness'), 4), 'instrumentalness': round(unit('instrumentalness') ** 3, 6),
+            'liveness': round(unit('liveness') / 2, 4), 'valence': round(unit('valence'), 3),
+            'tempo': round(60 + 140 * unit('tempo'), 3), 'type': 'audio_features', 'id': track_id,
+            'uri': f'spotify:track:{track_id}', 'track_href': f'{API_URL}/tracks/{track_id}',
+            'analysis_url': f'{API_URL}/audio-analysis/{track_id}',
+            'duration_ms': 120000 + int(_unit(self.seed, 'duration', i, j, k) * 240000), 'time_signature': 4,
+        }
+
+    def related_artists(self, i):
+        return [self.artist((i + int(_unit(self.seed, 'related', i, r) * self.artists)) % self.artists) for r in range(self.related)]
+
+    def top_tracks(self, i):
+        tracks = []
+        for j in range(min(self.albums_per_artist, 10)):
+            track = self._track(i, j, 0)
+            track.update(album=self._simplified_album(i, j), popularity=int(_unit(self.seed, 'track_popularity', i, j) * 100),
+                         external_ids={'isrc': f'US{i:05d}{j:05d}'}, is_playable=True)
+            tracks.append(track)
+        return tracks
+
+    def search(self, query, search_type, limit):
+        # 'Artist 12' / 'Album 3 by Artist 12' find that entity; any other query maps to a
+        # stable pseudo-random one, except queries containing 'nomatch'
+        if 'nomatch' in query.lower():
+            return []
+        numbers = [int(n) for n in re.findall(r'\d+', query)]
+        i = numbers[-1] if numbers else int(_unit(self.seed, 'search', query) * self.artists)
+        i %= self.artists
+        j = numbers[0] % self.albums_per_artist if len(numbers) > 1 else 0
+        if search_type == 'artist':
+            items = [self.artist((i + n) % self.artists) for n in range(limit)]
+        elif search_type == 'album':
+            items = [self._simplified_album(i, (j + n) % self.albums_per_artist) for n in range(limit)]
+        else:
+            items = [self._track(i, j, n % self._track_count(i, j)) for n in range(limit)]
+        return items
+
+
+def page(items, offset, limit, href):
+    # A Spotify paging object over items, with `next` pointing at the following page
+    following = f'{href}?offset={offset + limit}&limit={limit}' if offset + limit < len(items) else None
+    previous = f'{href}?offset={max(0, offset - limit)}&limit={limit}' if offset else None
+    return {
+        'href': f'{href}?offset={offset}&limit={limit}', 'items': items[offset:offset + limit], 'limit': limit,
+        'next': following, 'offset': offset, 'previous': previous, 'total': len(items),
+    }
+
+
+def _ids(query, limit):
+    ids = query.get('ids', '').split(',')
+    if len(ids) > limit:
+        raise _Error(400, f'Too many ids requested; the limit is {limit}')
+    return ids
+
+
+class _Error(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttled(self):
+        server = self.server.owner
+        if server.latency:
+            time.sleep(server.latency)
+        if server.throttle_rate and server.roll() < server.throttle_rate:
+            server.count('throttled')
+            self._send(429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+                       {'Retry-After': str(server.retry_after)})
+            return True
+        return False
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.owner.count('/api/token')
+        if self._throttled():
+            return
+        self._send(200, {'access_token': 'mock-token', 'token_type': 'Bearer', 'expires_in': 3600})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        path = url.path[len('/v1'):] if url.path.startswith('/v1/') else url.path
+        self.server.owner.count(path)
+        if self._throttled():
+            return
+        try:
+            body = self.server.owner.route(path, query)
+        except _Error as e:
+            return self._send(e.status, {'error': {'status': e.status, 'message': str(e)}})
+        # Generated bodies are deterministic, so a digest of one is a stable ETag
+        etag = '"%s"' % hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.server.owner.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+        self._send(200, body, {'ETag': etag})
+
+
+class MockSpotifyServer:
+    # Serves a MockCatalog on a local port from a background thread. `latency` seconds
+    # are added to every response and a `throttle_rate` share of requests is answered
+    # with 429 and Retry-After: `retry_after`, chosen by a seeded generator so runs are
+    # reproducible. Responses carry an ETag; a matching If-None-Match gets 304.
+    def __init__(self, catalog=None, latency=0.0, throttle_rate=0.0, retry_after=1, host='127.0.0.1', port=0, seed=0):
+        self.catalog = catalog or MockCatalog()
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.host = host
+        self.port = port
+        self._random = random.Random(seed)
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def api_url(self):
+        return self.url + '/v1'
+
+    @property
+    def auth_url(self):
+        return self.url + '/api/token'
+
+    def roll(self):
+        with self._lock:
+            return self._random.random()
+
+    def count(self, path):
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+
+    def get_counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def route(self, path, query):
+        catalog = self.catalog
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 20))
+        parts = path.strip('/').split('/')
+
+        if parts == ['search']:
+            search_type = query.get('type', 'track')
+            items = catalog.search(query.get('q', ''), search_type, min(limit, 50))
+            return {f'{search_type}s': page(items, 0, limit, f'{API_URL}/search')}
+        if parts == ['artists']:
+            return {'artists': [self._artist(id) for id in _ids(query, 50)]}
+        if parts == ['albums']:
+            return {'albums': [self._album(id) for id in _ids(query, 20)]}
+        if parts == ['audio-features']:
+            return {'audio_features': [self._features(id) for id in _ids(query, 100)]}
+        if len(parts) >= 2 and parts[0] == 'artists':
+            i = self._artist_index(parts[1])
+            if len(parts) == 2:
+                return catalog.artist(i)
+            if parts[2] == 'albums':
+                albums = [catalog._simplified_album(i, j) for j in range(catalog.albums_per_artist)]
+                return page(albums, offset, min(limit, 50), f'{API_URL}/artists/{parts[1]}/albums')
+            if parts[2] == 'related-artists':
+                return {'artists': catalog.related_artists(i)}
+            if parts[2] == 'top-tracks':
+                return {'tracks': catalog.top_tracks(i)}
+        if len(parts) >= 2 and parts[0] == 'albums':
+            match = _ALBUM.fullmatch(parts[1])
+            if not match:
+                raise _Error(400, 'invalid id')
+            if len(parts) == 2:
+                return self._album(parts[1])
+            if parts[2] == 'tracks':
+                tracks = catalog.tracks(int(match.group(1)), int(match.group(2)))
+                return page(tracks, offset, min(limit, 50), f'{API_URL}/albums/{parts[1]}/tracks')
+        raise _Error(404, 'Service not found')
+
+    def _artist_index(self, id):
+        match = _ARTIST.fullmatch(id)
+        if not match or int(match.group(1)) >= self.catalog.artists:
+            raise _Error(400, 'invalid id')
+        return int(match.group(1))
+
+    def _artist(self, id):
+        match = _ARTIST.fullmatch(id)
+        return self.catalog.artist(int(match.group(1))) if match else None
+
+    def _album(self, id):
+        match = _ALBUM.fullmatch(id)
+        return self.catalog.album(int(match.group(1)), int(match.group(2))) if match else None
+
+    def _features(self, id):
+        match = _TRACK.fullmatch(id)
+        return self.catalog.audio_features(*map(int, match.groups())) if match else None
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# One compact tuple per output row, built in a single pass over the API JSON.
+# Field order is the column order of the matching get_* DataFrame.
+
+TrackRecord = namedtuple('TrackRecord', [
+    'track_id', 'track_name', 'disc_number', 'duration_ms', 'explicit', 'popularity',
+    'artist_id', 'artist_name', 'album_id'
+])
+
+AlbumRecord = namedtuple('AlbumRecord', [
+    'album_id', 'label', 'album_name', 'artist_id', 'artist_name', 'release_date',
+    'total_tracks', 'album_type', 'popularity'
+])
+
+ArtistAlbumRecord = namedtuple('ArtistAlbumRecord', [
+    'album_type', 'album_id', 'album_name', 'release_date', 'total_tracks', 'artist_id', 'artist_name'
+])
+
+ProjectRecord = namedtuple('ProjectRecord', ['album_id', 'album_name', 'release_date', 'release_date_precision'])
+
+ArtistRecord = namedtuple('ArtistRecord', [
+    'artist_id', 'artist_name', 'genres', 'popularity', 'type', 'followers_total'
+])
+
+FeatureRecord = namedtuple('FeatureRecord', [
+    'danceability', 'energy', 'key', 'loudness', 'mode', 'speechiness', 'acousticness',
+    'instrumentalness', 'liveness', 'valence', 'tempo', 'track_id', 'duration_ms', 'time_signature'
+])
+
+
+def _join_artists(artists):
+    ids = []
+    names = []
+    for artist in artists:
+        ids.append(artist['id'])
+        names.append(artist['name'])
+    return ', '.join(ids), ', '.join(names)
+
+
+def track_record(track, album_id):
+    artist_id, artist_name = _join_artists(track['artists'])
+    # Popularity is not provided for the simplified tracks in album listings
+    return TrackRecord(
+        track['id'], track['name'], track['disc_number'], track['duration_ms'], track['explicit'],
+        track.get('popularity'), artist_id, artist_name, album_id
+    )
+
+
+def album_records(album):
+    # One row per credited artist
+    for artist in album['artists']:
+        yield AlbumRecord(
+            album['id'], album['label'], album['name'], artist['id'], artist['name'], album['release_date'],
+            album['total_tracks'], album['album_type'], album.get('popularity')
+        )
+
+
+def artist_album_record(album):
+    artist_id, artist_name = _join_artists(album['artists'])
+    return ArtistAlbumRecord(
+        album['album_type'], album['id'], album['name'], album['release_date'], album['total_tracks'],
+        artist_id, artist_name
+    )
+
+
+def project_record(album):
+    return ProjectRecord(album['id'], album['name'], album['release_date'], album['release_date_precision'])
+
+
+def artist_record(artist):
+    return ArtistRecord(
+        artist['id'], artist['name'], ', '.join(artist['genres']), artist['popularity'], artist['type'],
+        artist['followers']['total']
+    )
+
+
+def feature_record(feature):
+    return FeatureRecord(
+        feature['danceability'], feature['energy'], feature['key'], feature['loudness'], feature['mode'],
+        feature['speechiness'], feature['acousticness'], feature['instrumentalness'], feature['liveness'],
+        feature['valence'], feature['tempo'], feature['id'], feature['duration_ms'], feature['time_signature']
+    )
+
+
+def records_frame(records, record_type):
+    return pd.DataFrame.from_records(list(records), columns=record_type._fields)
@@ -0,0 +1,207 @@
+import asyncio
+import random
+import threading
+import time
+
+# Path segments that are part of an endpoint's name rather than an id
+_ENDPOINT_SEGMENTS = {'search', 'artists', 'albums', 'tracks', 'audio-features', 'related-artists', 'top-tracks', 'api', 'token'}
+
+
+def endpoint_name(path):
+    # '/artists/abc123/albums' -> '/artists/{id}/albums', so counters group by endpoint
+    path = path.split('?', 1)[0]
+    segments = [s if s in _ENDPOINT_SEGMENTS else '{id}' for s in path.strip('/').split('/') if s]
+    return '/' + '/'.join(segments)
+
+
+class TokenBucket:
+    # Allows `rate` requests per second on average with bursts of up to `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _take(self):
+        # Returns 0 once a token was taken, otherwise how long to wait before trying again
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        wait = self._take()
+        while wait:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self):
+        wait = self._take()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+    def pause(self, seconds):
+        # Hold back every caller, not just the one that got throttled
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            # Refill only starts once the pause is over, rather than a full burst at its end
+            self._updated = self._paused_until
+
+
+class RequestScheduler:
+    # Central gate every API request passes through: applies the optional rate limit,
+    # honours Retry-After on 429 by pausing every caller, retries 5xx and connection
+    # errors with jittered exponential backoff, and keeps per-endpoint counters.
+    def __init__(self, rate=None, burst=None, max_retries=5, backoff_base=0.5, backoff_max=30):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._paused_until = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint, key, value=1):
+        with self._lock:
+            counters = self._stats.setdefault(endpoint, {'requests': 0, 'retries': 0, 'throttled': 0, 'server_errors': 0, 'failures': 0, 'wait_seconds': 0.0})
+            counters[key] += value
+
+    def pause(self, seconds):
+        # Holds back every request sent through this scheduler, with or without a rate limit
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        if self.bucket is not None:
+            self.bucket.pause(seconds)
+
+    def _pause_left(self):
+        with self._lock:
+            return max(0, self._paused_until - time.monotonic())
+
+    def _wait_for_pause(self):
+        wait = self._pause_left()
+        while wait:
+            time.sleep(wait)
+            wait = self._pause_left()
+
+    async def _wait_for_pause_async(self):
+        wait = self._pause_left()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._pause_left()
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(0, delay)
+
+    def _retry_after(self, response, attempt):
+        value = response.headers.get('Retry-After')
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return self._backoff(attempt)
+
+    def _wait_for(self, endpoint, response, attempt):
+        # How long to wait before retrying, or None if the response should be handed back
+        if response.status_code == 429:
+            self._count(endpoint, 'throttled')
+            wait = self._retry_after(response, attempt)
+            self.pause(wait)
+        elif response.status_code >= 500:
+            self._count(endpoint, 'server_errors')
+            wait = self._backoff(attempt)
+        else:
+            return None
+        if attempt >= self.max_retries:
+            self._count(endpoint, 'failures')
+            return None
+        return wait
+
+    def _wait_for_error(self, endpoint, attempt):
+        if attempt >= self.max_retries:
+            self._count(endpoint, 'failures')
+            return None
+        return self._backoff(attempt)
+
+    def _retrying(self, endpoint, wait):
+        self._count(endpoint, 'retries')
+        self._count(endpoint, 'wait_seconds', wait)
+
+    def send(self, request, endpoint, retry_on=(OSError,)):
+        # request is a zero-argument callable that performs the HTTP call once
+        attempt = 0
+        while True:
+            self._wait_for_pause()
+            if self.bucket is not None:
+                self.bucket.acquire()
+            self._count(endpoint, 'requests')
+            try:
+                response = request()
+            except retry_on:
+                wait = self._wait_for_error(endpoint, attempt)
+                if wait is None:
+                    raise
+            else:
+                wait = self._wait_for(endpoint, response, attempt)
+                if wait is None:
+                    return response
+            self._retrying(endpoint, wait)
+            time.sleep(wait)
+            attempt += 1
+
+    async def send_async(self, request, endpoint, retry_on=(OSError,)):
+        # Same policy as send(), for a zero-argument coroutine function
+        attempt = 0
+        while True:
+            await self._wait_for_pause_async()
+            if self.bucket is not None:
+                await self.bucket.acquire_async()
+            self._count(endpoint, 'requests')
+            try:
+                response = await request()
+            except retry_on:
+                wait = self._wait_for_error(endpoint, attempt)
+                if wait is None:
+                    raise
+            else:
+                wait = self._wait_for(endpoint, response, attempt)
+                if wait is None:
+                    return response
+            self._retrying(endpoint, wait)
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
+
+
+def set_scheduler(scheduler=None):
+    global _scheduler
+    _scheduler = scheduler
@@ -0,0 +1,191 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+from .concurrency import chunked, parallel_map
+from .transport import SpotifyAPIError, api_get
+
+# One search path for every function that accepts a query. Query lists run concurrently,
+# identical queries (after normalize_query) are sent once, and with a SearchCache
+# installed resolutions persist across runs, so re-resolving a list of names only hits
+# the API for names not seen before.
+
+logger = logging.getLogger(__name__)
+
+# Queries are looked up against the cache and sent in groups of this size, so progress
+# is stored as it is made
+BATCH_SIZE = 500
+
+
+class SearchResult(namedtuple('SearchResult', ['query', 'search_type', 'items', 'error', 'cached'])):
+    # items holds the raw Spotify objects in rank order; error is the message of a
+    # failed search (items is then empty); cached is True if no request was needed
+    __slots__ = ()
+
+    @property
+    def matched(self):
+        return bool(self.items)
+
+    @property
+    def ids(self):
+        return [item['id'] for item in self.items]
+
+
+def normalize_query(query):
+    # Equivalent Unicode forms and repeated whitespace are folded; case is kept, since
+    # field filters such as isrc: or upc: take case-sensitive values
+    return ' '.join(unicodedata.normalize('NFKC', str(query)).split())
+
+
+def _key(search_type, query, limit, market):
+    return f'{search_type}|{market or ""}|{limit}|{query}'
+
+
+class SearchCache:
+    # SQLite store of normalized query -> result items. Matches stay fresh for `ttl`
+    # seconds; misses are kept for the shorter `no_match_ttl`, since a missing artist may
+    # simply not have been released yet.
+    def __init__(self, path='spotify_search.sqlite', ttl=30 * 86400, no_match_ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self.no_match_ttl = no_match_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS searches (key TEXT PRIMARY KEY, items TEXT, stored_at REAL)')
+
+    def get_many(self, keys):
+        found = {}
+        now = time.time()
+        with self._lock:
+            for chunk in chunked(keys, 500):
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(f'SELECT key, items, stored_at FROM searches WHERE key IN ({placeholders})', chunk)
+                for key, items, stored_at in rows:
+                    items = json.loads(items)
+                    if now - stored_at < (self.ttl if items else self.no_match_ttl):
+                        found[key] = items
+        return found
+
+    def put_many(self, results):
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO searches VALUES (?, ?, ?)',
+                    [(key, json.dumps(items), now) for key, items in results.items()]
+                )
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM searches')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_search_cache = None
+
+
+def get_search_cache():
+    return _search_cache
+
+
+def set_search_cache(cache=None):
+    # None switches persistent search caching off
+    global _search_cache
+    _search_cache = cache
+
+
+class _Resolution:
+    # Bookkeeping shared by search() and aio.search(): cache lookups and stores per
+    # batch, and the final per-query results
+    def __init__(self, queries, search_type, limit, market):
+        self.queries = list(queries)
+        self.normalized = [normalize_query(query) for query in self.queries]
+        # Normalized queries only dedupe and key the cache; Spotify gets the first
+        # spelling the caller used
+        self.spelling = {}
+        for query, normalized in zip(self.queries, self.normalized):
+            self.spelling.setdefault(normalized, str(query))
+        self.search_type = search_type
+        self.limit = limit
+        self.market = market
+        self.cache = get_search_cache()
+        self.resolved = {}
+        self.errors = {}
+        self.cached = set()
+
+    def batches(self):
+        return chunked(dict.fromkeys(self.normalized), BATCH_SIZE)
+
+    def params(self, query):
+        params = {'q': self.spelling[query], 'type': self.search_type, 'limit': self.limit}
+        if self.market:
+            params['market'] = self.market
+        return params
+
+    def missing(self, batch):
+        # Queries of batch that still need a request
+        if self.cache is not None:
+            hits = self.cache.get_many([_key(self.search_type, query, self.limit, self.market) for query in batch])
+            for query in batch:
+                items = hits.get(_key(self.search_type, query, self.limit, self.market))
+                if items is not None:
+                    self.resolved[query] = items
+                    self.cached.add(query)
+        return [query for query in batch if query not in self.resolved]
+
+    def store(self, responses):
+        # responses: (query, response or None, error or None)
+        fetched = {}
+        for query, response, error in responses:
+            if error is None:
+                items = response[f'{self.search_type}s']['items']
+                self.resolved[query] = fetched[_key(self.search_type, query, self.limit, self.market)] = items
+            else:
+                self.errors[query] = error
+        if self.cache is not None and fetched:
+            self.cache.put_many(fetched)
+
+    def results(self):
+        return [
+            SearchResult(query, self.search_type, self.resolved.get(key, []), self.errors.get(key), key in self.cached)
+            for query, key in zip(self.queries, self.normalized)
+        ]
+
+
+def search(queries, search_type, access_token=None, limit=1, market=None, max_workers=None):
+    # One SearchResult per query, in input order
+    resolution = _Resolution(queries, search_type, limit, market)
+
+    def fetch(query):
+        try:
+            return query, api_get('/search', access_token, params=resolution.params(query), error=f"Failed to search for {resolution.spelling[query]}"), None
+        except SpotifyAPIError as e:
+            return query, None, str(e)
+
+    for batch in resolution.batches():
+        resolution.store(parallel_map(fetch, resolution.missing(batch), max_workers))
+    return resolution.results()
+
+
+def search_items(queries, search_type, access_token=None, limit=1, market=None, max_workers=None):
+    # Matched items of every query, flattened in query order. Failed searches are logged
+    # (and reported to 'error' hooks) and contribute nothing, like unmatched ones.
+    return _matched_items(search(queries, search_type, access_token, limit, market, max_workers))
+
+
+def _matched_items(results):
+    items = []
+    for result in results:
+        if result.error is not None:
+            logger.warning("%s", result.error)
+        items.extend(result.items)
+    return items
@@ -0,0 +1,56 @@
+from ._lazy import LazyModule
+
+np = LazyModule('numpy')
+
+
+class RunningStats:
+    # Single-pass count, mean and variance for `groups` x len(columns) values, updated a
+    # batch at a time (Welford, with Chan's formula to fold each batch in). NaN values
+    # are skipped per column, like pandas' mean and std. Two RunningStats over the same
+    # columns merge into the stats of both inputs, so partial results from albums, chunks
+    # or workers can be combined in any order.
+    def __init__(self, columns, groups=1):
+        self.columns = list(columns)
+        shape = (groups, len(self.columns))
+        self.rows = np.zeros(groups, dtype='int64')
+        self.count = np.zeros(shape)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, values, groups=None):
+        # values: one row per observation in column order; groups: the group of each row
+        values = np.asarray(values, dtype='float64').reshape(-1, len(self.columns))
+        groups = np.zeros(len(values), dtype='int64') if groups is None else np.asarray(groups, dtype='int64')
+        valid = ~np.isnan(values)
+        count = np.zeros_like(self.count)
+        total = np.zeros_like(self.count)
+        np.add.at(count, groups, valid)
+        np.add.at(total, groups, np.where(valid, values, 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, 0)
+        deviation = np.where(valid, values - mean[groups], 0)
+        m2 = np.zeros_like(self.count)
+        np.add.at(m2, groups, deviation * deviation)
+        self._fold(count, mean, m2)
+        self.rows += np.bincount(groups, minlength=len(self.rows))
+        return self
+
+    def merge(self, other):
+        self._fold(other.count, other.mean, other.m2)
+        self.rows += other.rows
+        return self
+
+    def _fold(self, count, mean, m2):
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta * delta * self.count * count / total, 0)
+        self.count = total
+
+    def means(self):
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def stds(self, ddof=1):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, np.sqrt(self.m2 / (self.count - ddof)), np.nan)
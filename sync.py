@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import time
+
+from .artist_functions import _add_key_modes, _albums_audio_features, _artists_projects, get_artists
+from ._lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Incremental version of get_artist_audio_features for daily refreshes. The store keeps,
+# per artist, the album ids already processed, when the artist was last synced, and the
+# rows produced so far. A sync lists the artist's releases, fetches tracks and audio
+# features only for albums it has not seen, and appends those rows.
+
+
+class CatalogStore:
+    def __init__(self, path='spotify_catalog.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS artists (artist_id TEXT PRIMARY KEY, last_sync REAL)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS artist_albums (artist_id TEXT, album_id TEXT, PRIMARY KEY (artist_id, album_id))'
+            )
+
+    def known_album_ids(self, artist_id):
+        with self._lock:
+            rows = self._conn.execute('SELECT album_id FROM artist_albums WHERE artist_id = ?', (artist_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def last_sync(self, artist_id):
+        with self._lock:
+            row = self._conn.execute('SELECT last_sync FROM artists WHERE artist_id = ?', (artist_id,)).fetchone()
+        return row[0] if row else None
+
+    def _has_rows_table(self):
+        return self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'artist_tracks'").fetchone() is not None
+
+    def save(self, artist_id, album_ids, rows, synced_at=None):
+        album_ids = list(album_ids)
+        with self._lock:
+            # Clear rows left behind by an interrupted sync before appending, so a retry
+            # never duplicates them
+            if album_ids and self._has_rows_table():
+                with self._conn:
+                    self._conn.executemany(
+                        'DELETE FROM artist_tracks WHERE artist_id = ? AND album_id = ?',
+                        [(artist_id, album_id) for album_id in album_ids]
+                    )
+            if rows is not None and not rows.empty:
+                rows = rows.astype({column: str for column in ('key_name', 'mode_name', 'key_mode') if column in rows})
+                rows.rename(columns={'artist_id_x': 'artist_id'}).to_sql('artist_tracks', self._conn, if_exists='append', index=False)
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO artist_albums VALUES (?, ?)', [(artist_id, album_id) for album_id in album_ids]
+                )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO artists VALUES (?, ?)', (artist_id, synced_at or time.time())
+                )
+
+    def load(self, artist_ids):
+        with self._lock:
+            if not self._has_rows_table():
+                return pd.DataFrame()
+            placeholders = ','.join('?' * len(artist_ids))
+            rows = pd.read_sql(
+                f'SELECT * FROM artist_tracks WHERE artist_id IN ({placeholders}) ORDER BY rowid',
+                self._conn, params=list(artist_ids)
+            )
+        rows = rows.rename(columns={'artist_id': 'artist_id_x'})
+        rows['album_release_year'] = rows['album_release_year'].astype('Int64')
+        # SQLite returns 0/1 and NULL; albums without tracks keep a missing explicit, as
+        # in get_artist_audio_features
+        explicit = rows['explicit']
+        rows['explicit'] = explicit.astype(bool) if explicit.notna().all() else explicit.map(bool, na_action='ignore').astype(object)
+        return _add_key_modes(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def sync_artists_audio_features(ids, store, access_token=None, max_workers=None):
+    # Brings every artist in ids up to date in the store and returns their combined rows
+    # in the same layout as get_artist_audio_features
+    info = get_artists(ids=ids, access_token=access_token, max_workers=max_workers)
+    albums = _artists_projects(info, access_token, max_workers)
+
+    # Only releases the store has not seen yet; tracks and features for all of them go
+    # out in shared batches
+    known = {artist_id: store.known_album_ids(artist_id) for artist_id in info['artist_id']}
+    is_new = [album_id not in known[artist_id] for artist_id, album_id in zip(albums['artist_id'], albums['album_id'])]
+    new_albums = albums[is_new].reset_index(drop=True)
+    rows = _albums_audio_features(new_albums, access_token, max_workers) if not new_albums.empty else None
+
+    synced_at = time.time()
+    for artist_id in info['artist_id']:
+        artist_rows = rows[rows['artist_id_x'] == artist_id] if rows is not None else None
+        store.save(artist_id, new_albums.loc[new_albums['artist_id'] == artist_id, 'album_id'], artist_rows, synced_at)
+
+    return store.load(info['artist_id'].tolist())
+
+
+def sync_artist_audio_features(query=None, id=None, store=None, access_token=None, max_workers=None):
+    if query:
+        id = get_artists(queries=[query], access_token=access_token)['artist_id'].iloc[0]
+    if not id:
+        raise ValueError("Artist ID must be provided or found through a search query.")
+    if store is None:
+        store = CatalogStore()
+    return sync_artists_audio_features([id], store, access_token=access_token, max_workers=max_workers)
@@ -0,0 +1,47 @@
+import pytest
+
+from ..cache import get_cache, set_cache
+from ..entity_store import EntityStore, get_entity_store, set_entity_store
+from ..hooks import clear_hooks
+from ..mock_server import MockCatalog, MockSpotifyServer
+from ..scheduler import RequestScheduler, get_scheduler, set_scheduler
+from ..search import get_search_cache, set_search_cache
+from ..transport import get_session, get_urls, set_session
+
+# Tests run against MockSpotifyServer on a local port; nothing touches the real API
+
+TOKEN = 'test-token'
+
+
+@pytest.fixture(scope='session')
+def catalog():
+    return MockCatalog(artists=8, albums_per_artist=3, tracks_per_album=5, related=4)
+
+
+@pytest.fixture(scope='session')
+def server(catalog):
+    with MockSpotifyServer(catalog) as server:
+        yield server
+
+
+def use_server(server):
+    set_session(base_url=server.api_url, auth_url=server.auth_url)
+
+
+@pytest.fixture(autouse=True)
+def client(server):
+    # Every test starts from a fresh client pointed at the shared mock, with no caches,
+    # reuse or hooks carried over; the caller's setup is restored afterwards
+    saved = (get_session(),) + get_urls(), get_scheduler(), get_cache(), get_search_cache(), get_entity_store()
+    use_server(server)
+    set_scheduler(RequestScheduler(backoff_base=0.01))
+    set_cache(None)
+    set_search_cache(None)
+    set_entity_store(EntityStore())
+    yield
+    clear_hooks()
+    set_session(*saved[0])
+    set_scheduler(saved[1])
+    set_cache(saved[2])
+    set_search_cache(saved[3])
+    set_entity_store(saved[4])
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from ..album_functions import get_album_tracks
+from .conftest import TOKEN
+
+pytest.importorskip('aiohttp')
+
+from .. import aio  # noqa: E402
+
+
+def run(server, coroutine):
+    # One event loop per call, with the aio client pointed at the mock
+    async def main():
+        aio.set_client(base_url=server.api_url)
+        try:
+            return await coroutine
+        finally:
+            await aio.close()
+            aio.set_client()
+    return asyncio.run(main())
+
+
+def test_album_tracks_match_the_blocking_api(catalog, server):
+    ids = catalog.album_ids(0)
+    result = run(server, aio.get_album_tracks(ids=ids, access_token=TOKEN))
+    assert result.equals(get_album_tracks(ids=ids, access_token=TOKEN))
+
+
+def test_album_tracks_skip_unknown_albums(catalog, server):
+    ids = catalog.album_ids(0)
+    result = run(server, aio.get_album_tracks(ids=ids + ['b' + '9' * 21], access_token=TOKEN))
+    assert result.equals(get_album_tracks(ids=ids, access_token=TOKEN))
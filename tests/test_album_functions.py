@@ -0,0 +1,9 @@
+from ..album_functions import get_albums, iter_albums
+from .conftest import TOKEN
+
+
+def test_albums_skip_unknown_ids(catalog):
+    ids = catalog.album_ids(0)
+    result = get_albums(ids=ids[:1] + ['b' + '9' * 21] + ids[1:], access_token=TOKEN)
+    assert result.equals(get_albums(ids=ids, access_token=TOKEN))
+    assert len(list(iter_albums(ids=['b' + '9' * 21] + ids[:1], access_token=TOKEN))) == 1
@@ -0,0 +1,17 @@
+import pytest
+
+from ..artist_functions import get_artists, get_artists_summary
+from .conftest import TOKEN
+
+
+def test_artists_skip_unknown_ids(catalog):
+    ids = catalog.artist_ids(3)
+    result = get_artists(ids=ids[:1] + ['a' + '9' * 21] + ids[1:], access_token=TOKEN)
+    assert result.equals(get_artists(ids=ids, access_token=TOKEN))
+
+
+def test_artists_summary_names_unmatched_queries():
+    with pytest.raises(ValueError, match='nomatch band'):
+        get_artists_summary(queries=['Artist 1', 'nomatch band'], access_token=TOKEN)
+    summary = get_artists_summary(queries=['Artist 1', 'Artist 2'], access_token=TOKEN)
+    assert summary['artist_name'].tolist() == ['Artist 1', 'Artist 2']
@@ -0,0 +1,15 @@
+from ..benchmark import compare, run_benchmarks
+from ..transport import get_urls
+
+
+def test_run_benchmarks_restores_the_client(server):
+    before = get_urls()
+    results = run_benchmarks(artists=3, albums_per_artist=2, tracks_per_album=4, scenarios=('get_artist_audio_features',))
+    assert get_urls() == before
+    assert results[0]['rows'] > 0 and results[0]['requests'] > 0
+
+
+def test_compare_flags_growth_beyond_tolerance():
+    baseline = [{'scenario': 's', 'seconds': 1.0, 'requests': 10, 'peak_mb': 5.0}]
+    results = [{'scenario': 's', 'seconds': 1.1, 'requests': 13, 'peak_mb': 5.0}]
+    assert compare(results, baseline, tolerance=0.2) == ['s: requests 10 -> 13']
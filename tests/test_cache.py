@@ -0,0 +1,58 @@
+import pytest
+
+from ..cache import ResponseCache, set_cache
+from ..transport import SpotifyAPIError, api_get
+from .conftest import TOKEN
+
+
+def requests_for(server, path, call):
+    before = server.get_counts().get(path, 0)
+    result = call()
+    return result, server.get_counts().get(path, 0) - before
+
+
+def test_fresh_responses_are_served_from_the_cache(catalog, server, tmp_path):
+    set_cache(ResponseCache(str(tmp_path / 'cache.sqlite')))
+    path = '/artists/' + catalog.artist_ids(1)[0]
+    first, sent = requests_for(server, path, lambda: api_get(path, TOKEN))
+    assert sent == 1
+    second, sent = requests_for(server, path, lambda: api_get(path, TOKEN))
+    assert sent == 0
+    assert second == first
+
+
+def test_stale_responses_are_revalidated_with_etag(catalog, server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttl={'/artists/{id}': 0})
+    set_cache(cache)
+    path = '/artists/' + catalog.artist_ids(1)[0]
+    first = api_get(path, TOKEN)
+    assert cache.get('/artists/{id}', path).etag
+    not_modified = server.get_counts().get('not_modified', 0)
+    second, sent = requests_for(server, path, lambda: api_get(path, TOKEN))
+    assert sent == 1
+    assert server.get_counts().get('not_modified', 0) == not_modified + 1
+    assert second == first
+
+
+def test_offline_mode_serves_stale_entries_and_fails_on_misses(catalog, server, tmp_path):
+    ids = catalog.artist_ids(2)
+    cache_path = str(tmp_path / 'cache.sqlite')
+    set_cache(ResponseCache(cache_path, ttl={'/artists/{id}': 0}))
+    cached = api_get('/artists/' + ids[0], TOKEN)
+
+    set_cache(ResponseCache(cache_path, ttl={'/artists/{id}': 0}, offline=True))
+    result, sent = requests_for(server, '/artists/' + ids[0], lambda: api_get('/artists/' + ids[0], TOKEN))
+    assert (result, sent) == (cached, 0)
+    with pytest.raises(SpotifyAPIError, match='offline'):
+        api_get('/artists/' + ids[1], TOKEN)
+    assert server.get_counts().get('/artists/' + ids[1], 0) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_entries=10)
+    for i in range(99):
+        cache.set('/search', f'key{i}', {'i': i})
+    assert cache.get('/search', 'key0') is not None
+    cache.set('/search', 'key99', {'i': 99})
+    kept = [i for i in range(100) if cache.get('/search', f'key{i}') is not None]
+    assert kept == [0] + list(range(91, 100))
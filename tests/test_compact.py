@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from ..artist_functions import get_artist_audio_features
+from ..compact import compact_frame, memory_report
+from .conftest import TOKEN
+
+
+def test_compact_frame_narrows_dtypes_and_keeps_values(catalog):
+    features = get_artist_audio_features(id=catalog.artist_ids(1)[0], access_token=TOKEN)
+    compact = compact_frame(features)
+    assert compact['danceability'].dtype == 'float32'
+    assert compact['key'].dtype == 'int8'
+    assert compact['duration_ms'].dtype == 'int32'
+    assert isinstance(compact['album_id'].dtype, pd.CategoricalDtype)
+    assert compact['album_id'].astype(object).tolist() == features['album_id'].tolist()
+    assert np.allclose(compact['tempo'], features['tempo'], rtol=1e-6)
+    assert (compact['key'] == features['key']).all()
+    assert features['danceability'].dtype == 'float64'
+
+
+def test_compact_frame_uses_nullable_ints_for_missing_values():
+    frame = pd.DataFrame({'key': [1, None], 'popularity': [None, None], 'explicit': [True, None]})
+    compact = compact_frame(frame)
+    assert compact['key'].dtype == 'Int8'
+    assert compact['popularity'].dtype == 'Int8'
+    assert compact['explicit'].dtype == 'boolean'
+    assert compact['key'].isna().tolist() == [False, True]
+
+
+def test_memory_report_totals(catalog):
+    features = get_artist_audio_features(id=catalog.artist_ids(1)[0], access_token=TOKEN)
+    report = memory_report(features)
+    total = report.iloc[-1]
+    assert total['column'] == 'total'
+    assert total['bytes'] == report['bytes'].iloc[:-1].sum()
+    assert total['compact_bytes'] < total['bytes']
+    assert report['column'].iloc[:-1].tolist() == list(features.columns)
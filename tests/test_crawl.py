@@ -0,0 +1,22 @@
+from ..crawl import CrawlStore, crawl_related_artists
+from .conftest import TOKEN
+
+
+def test_crawl_resumes_to_the_same_graph(catalog, tmp_path):
+    seeds = catalog.artist_ids(1)
+    fresh_nodes, fresh_edges = crawl_related_artists(seeds, depth=2, store=CrawlStore(str(tmp_path / 'fresh.sqlite')), access_token=TOKEN)
+
+    store = CrawlStore(str(tmp_path / 'resumed.sqlite'))
+    crawl_related_artists(seeds, depth=1, store=store, access_token=TOKEN)
+    nodes, edges = crawl_related_artists(seeds, depth=2, store=store, access_token=TOKEN)
+    assert set(nodes['artist_id']) == set(fresh_nodes['artist_id'])
+    assert len(edges) == len(fresh_edges)
+    assert nodes['artist_name'].notna().all()
+
+
+def test_crawl_keeps_unknown_seed_as_placeholder(tmp_path):
+    unknown = 'a' + '9' * 21
+    nodes, edges = crawl_related_artists([unknown], depth=1, store=CrawlStore(str(tmp_path / 'crawl.sqlite')), access_token=TOKEN)
+    assert nodes['artist_id'].tolist() == [unknown]
+    assert nodes['artist_name'].tolist() == ['']
+    assert edges.empty
@@ -0,0 +1,37 @@
+import pytest
+
+from ..album_functions import get_album_tracks
+from ..artist_functions import get_artists
+from ..export import export_album_tracks, export_artists, write_rows
+from .conftest import TOKEN
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+
+def test_album_tracks_stream_to_parquet(catalog, tmp_path):
+    ids = catalog.album_ids(0)
+    path = str(tmp_path / 'tracks.parquet')
+    written = export_album_tracks(path, ids=ids, access_token=TOKEN, batch_size=4)
+    table = pa.parquet.read_table(path)
+    expected = get_album_tracks(ids=ids, access_token=TOKEN)
+    assert written == table.num_rows == len(expected)
+    assert table.column('track_id').to_pylist() == expected['track_id'].tolist()
+    assert table.schema.field('artist_id').type == pa.list_(pa.string())
+
+
+def test_artists_stream_to_arrow_with_growing_categories(catalog, tmp_path):
+    ids = catalog.artist_ids(8)
+    path = str(tmp_path / 'artists.arrow')
+    # Small batches make later batches add genres, which Arrow IPC takes as deltas
+    assert export_artists(path, ids=ids, access_token=TOKEN, format='arrow', batch_size=2) == len(ids)
+    table = pa.ipc.open_file(path).read_all()
+    expected = get_artists(ids=ids, access_token=TOKEN)
+    assert table.column('artist_id').to_pylist() == expected['artist_id'].tolist()
+    assert [', '.join(genres) for genres in table.column('genres').to_pylist()] == expected['genres'].tolist()
+
+
+def test_unknown_formats_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_rows([], 'artists', str(tmp_path / 'artists.csv'), format='csv')
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..feature_index import FEATURE_RANGES, FeatureIndex
+
+
+def features(ids, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({feature: rng.uniform(low, high, len(ids)) for feature, (low, high) in FEATURE_RANGES.items()})
+    frame['track_id'] = ids
+    return frame
+
+
+def test_reopened_index_keeps_vectors_and_ids(tmp_path):
+    path = str(tmp_path / 'index')
+    index = FeatureIndex(path, capacity=2)
+    assert index.add(features(['t0', 't1', 't2'])) == 3
+    vectors = index.vectors(['t0', 't1', 't2'])
+
+    reopened = FeatureIndex(path)
+    assert reopened.ids == ['t0', 't1', 't2']
+    assert np.array_equal(reopened.vectors(['t0', 't1', 't2']), vectors)
+    assert reopened.knn(['t0'], k=1)['query'].tolist() == ['t0']
+
+
+def test_crash_during_add_does_not_shift_later_ids(tmp_path, monkeypatch):
+    path = str(tmp_path / 'index')
+    index = FeatureIndex(path)
+    index.add(features(['t0', 't1', 't2']))
+
+    # Crash after the ids were appended but before the metadata recorded them
+    def crash(self):
+        raise RuntimeError('crash')
+    monkeypatch.setattr(FeatureIndex, '_write_meta', crash)
+    with pytest.raises(RuntimeError):
+        index.add(features(['t3'], seed=1))
+    monkeypatch.undo()
+
+    reopened = FeatureIndex(path)
+    assert len(reopened) == 3 and 't3' not in reopened
+    new = features(['t4'], seed=2)
+    reopened.add(new)
+
+    again = FeatureIndex(path)
+    assert again.ids == ['t0', 't1', 't2', 't4']
+    assert np.allclose(again.vectors(['t4'])[0], again.normalize(new[again.features].to_numpy())[0])
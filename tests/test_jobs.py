@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from ..album_functions import get_album_track_features
+from .. import jobs
+from ..jobs import run_job
+from .conftest import TOKEN
+
+
+def test_job_resumes_and_skips_unknown_albums(catalog, tmp_path):
+    unknown = 'b' + '9' * 21
+    ids = catalog.album_ids(0) + [unknown] + catalog.album_ids(1)
+    directory = str(tmp_path / 'job')
+    result = run_job('album', ids, directory, access_token=TOKEN, processes=2, shard_size=2)
+    expected = get_album_track_features(ids=catalog.album_ids(0) + catalog.album_ids(1), access_token=TOKEN)
+    assert sorted(result['track_id']) == sorted(expected['track_id'])
+
+    # Losing a finished shard only reruns that shard
+    os.remove(os.path.join(directory, 'shard-00001.pkl'))
+    resumed = run_job('album', ids, directory, access_token=TOKEN, processes=2, shard_size=2)
+    pd.testing.assert_frame_equal(resumed, result)
+    with open(os.path.join(directory, 'manifest.jsonl')) as f:
+        assert unknown in f.read()
+
+
+def test_cli_runs_without_runpy_warning():
+    # The package must not import jobs itself, or runpy warns before running it
+    root = os.path.dirname(os.path.dirname(os.path.abspath(jobs.__file__)))
+    command = [sys.executable, '-W', 'error::RuntimeWarning', '-m', jobs.__name__, '--help']
+    result = subprocess.run(command, cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert not result.stderr
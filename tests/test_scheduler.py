@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from ..artist_functions import get_artists_audio_features
+from ..entity_store import EntityStore, set_entity_store
+from ..mock_server import MockSpotifyServer
+from ..scheduler import RequestScheduler, TokenBucket, get_scheduler
+from ..transport import SpotifyAPIError, api_get
+from .conftest import TOKEN, use_server
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def responses(*statuses, retry_after='0.3'):
+    # A request callable answering with each status in turn, then 200
+    queue = list(statuses)
+
+    def request():
+        status = queue.pop(0) if queue else 200
+        return Response(status, {'Retry-After': retry_after} if status == 429 else {})
+    return request
+
+
+def test_retry_after_holds_back_other_callers():
+    # No rate limit is set, so only the scheduler-wide pause can hold the second caller
+    scheduler = RequestScheduler()
+    sent = {}
+    throttled = threading.Event()
+
+    def first():
+        if 'first' in sent:
+            return Response(200)
+        sent['first'] = time.monotonic()
+        throttled.set()
+        return Response(429, {'Retry-After': '0.3'})
+
+    def second():
+        sent['second'] = time.monotonic()
+        return Response(200)
+
+    thread = threading.Thread(target=scheduler.send, args=(first, '/a'))
+    thread.start()
+    throttled.wait()
+    assert scheduler.send(second, '/b').status_code == 200
+    thread.join()
+    assert sent['second'] - sent['first'] >= 0.3
+    assert scheduler.get_stats()['/a']['throttled'] == 1
+
+
+def test_server_errors_are_retried_then_returned():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0.01)
+    assert scheduler.send(responses(500, 503), '/a').status_code == 200
+    assert scheduler.send(responses(500, 500, 500), '/b').status_code == 500
+    stats = scheduler.get_stats()
+    assert stats['/a']['retries'] == 2 and stats['/a']['failures'] == 0
+    assert stats['/b']['requests'] == 3 and stats['/b']['failures'] == 1
+
+
+def test_connection_errors_are_retried():
+    scheduler = RequestScheduler(max_retries=1, backoff_base=0.01)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('reset')
+        return Response(200)
+    assert scheduler.send(request, '/a').status_code == 200
+    with pytest.raises(ConnectionError):
+        scheduler.send(lambda: (_ for _ in ()).throw(ConnectionError('down')), '/b')
+
+
+def test_bucket_does_not_burst_when_a_pause_ends():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(0.1)
+    time.sleep(0.11)
+    assert bucket._take() > 0
+
+
+def test_throttled_responses_are_retried_against_the_mock(catalog):
+    ids = catalog.artist_ids(2)
+    expected = get_artists_audio_features(ids, access_token=TOKEN)
+    set_entity_store(EntityStore())
+    with MockSpotifyServer(catalog, throttle_rate=0.3, retry_after=0) as server:
+        use_server(server)
+        result = get_artists_audio_features(ids, access_token=TOKEN)
+        assert server.get_counts()['throttled'] > 0
+    assert result.equals(expected)
+    assert sum(counters['throttled'] for counters in get_scheduler().get_stats().values()) > 0
+
+
+def test_persistent_throttling_raises(catalog):
+    with MockSpotifyServer(catalog, throttle_rate=1.0, retry_after=0) as server:
+        use_server(server)
+        get_scheduler().max_retries = 2
+        with pytest.raises(SpotifyAPIError) as error:
+            api_get(f'/artists/{catalog.artist_ids(1)[0]}', TOKEN)
+    assert error.value.status_code == 429
@@ -0,0 +1,18 @@
+from ..hooks import add_hook
+from ..search import normalize_query, search
+from .conftest import TOKEN
+
+
+def test_normalize_query_keeps_case():
+    assert normalize_query('  isrc:USABC1234567　') == 'isrc:USABC1234567'
+    assert normalize_query('ISRC:usabc1234567') != normalize_query('isrc:USABC1234567')
+
+
+def test_search_dedupes_whitespace_variants_only():
+    sent = []
+    add_hook('before', lambda event: sent.append(event.params['q']))
+    queries = ['isrc:USABC1234567', ' isrc:USABC1234567 ', 'ISRC:usabc1234567']
+    results = search(queries, 'track', access_token=TOKEN)
+    assert sorted(sent) == ['ISRC:usabc1234567', 'isrc:USABC1234567']
+    assert [result.query for result in results] == queries
+    assert results[0].ids == results[1].ids
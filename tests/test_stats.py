@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from ..album_functions import get_album_summary, get_album_track_features
+from ..artist_functions import get_artists_audio_features, get_artists_summary
+from ..stats import RunningStats
+from .conftest import TOKEN
+
+SUMMARY_FEATURES = ['danceability', 'energy', 'loudness', 'speechiness', 'acousticness',
+                    'instrumentalness', 'liveness', 'valence', 'tempo']
+
+
+def test_running_stats_merge_matches_pandas():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(500, 3))
+    values[::7, 1] = np.nan
+    groups = rng.integers(0, 4, size=500)
+
+    left, right = RunningStats('abc', groups=4), RunningStats('abc', groups=4)
+    for start in range(0, 250, 33):
+        left.update(values[start:min(start + 33, 250)], groups[start:min(start + 33, 250)])
+    right.update(values[250:], groups[250:])
+    merged = left.merge(right)
+
+    expected = pd.DataFrame(values).groupby(groups)
+    assert np.allclose(merged.means(), expected.mean().to_numpy())
+    assert np.allclose(merged.stds(), expected.std().to_numpy())
+    assert merged.rows.tolist() == np.bincount(groups, minlength=4).tolist()
+
+
+def test_album_summary_matches_track_features(catalog):
+    album_id = catalog.album_ids(0)[0]
+    summary = get_album_summary(id=[album_id], access_token=TOKEN)
+    features = get_album_track_features(ids=[album_id], access_token=TOKEN)
+    for feature in SUMMARY_FEATURES:
+        assert math.isclose(summary[f'mean_{feature}'].iloc[0], features[feature].mean())
+        assert math.isclose(summary[f'std_{feature}'].iloc[0], features[feature].std())
+
+
+def test_artists_summary_matches_audio_features(catalog):
+    ids = catalog.artist_ids(3)
+    summary = get_artists_summary(ids=ids, access_token=TOKEN).set_index('artist_id')
+    rows = get_artists_audio_features(ids, access_token=TOKEN)
+    expected = rows.groupby('artist_id_x')
+    assert summary['num_songs'].to_dict() == expected.size().to_dict()
+    for feature in SUMMARY_FEATURES:
+        assert np.allclose(summary[f'{feature}_mean'], expected[feature].mean()[summary.index])
+        assert np.allclose(summary[f'{feature}_std'], expected[feature].std()[summary.index])
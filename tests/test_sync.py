@@ -0,0 +1,61 @@
+import pytest
+
+from ..artist_functions import get_artists_audio_features
+from ..mock_server import page
+from ..sync import CatalogStore, sync_artists_audio_features
+from .conftest import TOKEN
+
+
+def test_sync_appends_only_new_albums(catalog, tmp_path):
+    ids = catalog.artist_ids(2)
+    store = CatalogStore(str(tmp_path / 'catalog.sqlite'))
+    first = sync_artists_audio_features(ids, store, access_token=TOKEN)
+    second = sync_artists_audio_features(ids, store, access_token=TOKEN)
+    expected = get_artists_audio_features(ids, access_token=TOKEN)
+    assert len(first) == len(second) == len(expected)
+    assert not second.duplicated(['artist_id_x', 'track_id']).any()
+    assert second['explicit'].tolist() == expected['explicit'].tolist()
+    assert second['explicit'].dtype == expected['explicit'].dtype
+
+
+def test_sync_keeps_missing_explicit_of_trackless_albums(catalog, server, monkeypatch, tmp_path):
+    ids = catalog.artist_ids(2)
+    empty = catalog.album_ids(1)[0]
+    route = type(server).route
+
+    def without_tracks(self, path, query):
+        body = route(self, path, query)
+        if path == f'/albums/{empty}/tracks':
+            body['items'] = []
+        for album in body.get('albums', []) if path == '/albums' else []:
+            if album and album['id'] == empty:
+                album['tracks']['items'] = []
+        return body
+    monkeypatch.setattr(type(server), 'route', without_tracks)
+
+    rows = sync_artists_audio_features(ids, CatalogStore(str(tmp_path / 'catalog.sqlite')), access_token=TOKEN)
+    expected = get_artists_audio_features(ids, access_token=TOKEN)
+    assert rows['explicit'].isna().sum() == expected['explicit'].isna().sum() == 1
+    assert rows['explicit'].dtype == expected['explicit'].dtype
+
+
+def test_sync_skips_artists_without_releases(catalog, server, monkeypatch, tmp_path):
+    ids = catalog.artist_ids(3)
+    route = type(server).route
+
+    def without_releases(self, path, query):
+        if path == f'/artists/{ids[2]}/albums':
+            return page([], 0, 20, path)
+        return route(self, path, query)
+    monkeypatch.setattr(type(server), 'route', without_releases)
+
+    rows = sync_artists_audio_features(ids, CatalogStore(str(tmp_path / 'catalog.sqlite')), access_token=TOKEN)
+    assert set(rows['artist_id_x']) == set(ids[:2])
+    with pytest.raises(ValueError):
+        get_artists_audio_features(ids, access_token=TOKEN)
+
+
+def test_sync_skips_unknown_artists(catalog, tmp_path):
+    ids = catalog.artist_ids(2)
+    rows = sync_artists_audio_features(ids + ['a' + '9' * 21], CatalogStore(str(tmp_path / 'catalog.sqlite')), access_token=TOKEN)
+    assert set(rows['artist_id_x']) == set(ids)
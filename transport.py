@@ -0,0 +1,208 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import cache_key, get_cache
+from .constants import DEFAULT_TIMEOUT, PAGE_SIZE
+from .hooks import cache_hit, observe, request_failed
+from .scheduler import endpoint_name, get_scheduler
+
+API_URL = 'https://api.spotify.com/v1'
+AUTH_URL = 'https://accounts.spotify.com/api/token'
+
+_session = None
+_base_url = API_URL
+_auth_url = AUTH_URL
+_timeout = DEFAULT_TIMEOUT
+_lock = threading.Lock()
+
+
+def create_session(pool_maxsize=32):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    # One keep-alive pool per host, sized so concurrent callers do not block on connections
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def set_session(session=None, base_url=None, auth_url=None):
+    # Swap the shared client, e.g. for one pointed at a local stub server.
+    # Passing nothing restores a fresh pooled session against the real API.
+    global _session, _base_url, _auth_url
+    with _lock:
+        _session = session
+        _base_url = (base_url or API_URL).rstrip('/')
+        _auth_url = auth_url or AUTH_URL
+
+
+def get_urls():
+    # (API base URL, token URL) requests currently go to
+    return _base_url, _auth_url
+
+
+def get_timeout():
+    return _timeout
+
+
+def set_timeout(timeout=DEFAULT_TIMEOUT):
+    # (connect, read) seconds, or one number for both. Timeouts are connection errors to
+    # the scheduler, so they are retried with backoff. None waits forever.
+    global _timeout
+    _timeout = timeout
+
+
+def api_url(path):
+    if path.startswith(API_URL):
+        path = path[len(API_URL):]
+    elif path.startswith('http://') or path.startswith('https://'):
+        return path
+    return _base_url + path
+
+
+class SpotifyAPIError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def resolve_token(access_token):
+    # access_token may be a plain string, a TokenProvider, or None for the
+    # provider built from SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET
+    if access_token is None:
+        from .authorize import get_default_token_provider
+        access_token = get_default_token_provider()
+    return access_token
+
+
+def _bearer(access_token, etag=None):
+    if hasattr(access_token, 'get_token'):
+        access_token = access_token.get_token()
+    headers = {'Authorization': f'Bearer {access_token}'}
+    if etag:
+        headers['If-None-Match'] = etag
+    return headers
+
+
+class _CachedGet:
+    # The cache lookup before a GET and the response handling after it, shared by
+    # api_get and aio.api_get, which differ only in how the request is sent
+    def __init__(self, url, base_url, path, params, error):
+        relative = url[len(base_url):] if url.startswith(base_url) else path
+        self.url = url
+        self.params = params
+        self.error = error
+        self.endpoint = endpoint_name(relative)
+        self.cache = get_cache()
+        self.key = self.entry = self.state = None
+        self.hit = False
+        if self.cache is not None:
+            self.key = cache_key(relative, params)
+            self.entry = self.cache.get(self.endpoint, self.key)
+            if self.entry is not None and (self.entry.fresh or self.cache.offline):
+                cache_hit('GET', self.endpoint, url, params)
+                self.hit = True
+                return
+            if self.cache.offline:
+                raise self._failed(SpotifyAPIError(f"{error}: no cached response for {self.key} in offline mode"))
+            self.state = 'stale' if self.entry is not None else 'miss'
+
+    @property
+    def etag(self):
+        return self.entry.etag if self.entry is not None else None
+
+    def retry(self, response, access_token):
+        # Token was revoked or expired early; refresh once and retry
+        if response.status_code == 401 and hasattr(access_token, 'invalidate'):
+            access_token.invalidate()
+            return True
+        return False
+
+    def result(self, response):
+        if response.status_code == 304 and self.entry is not None:
+            self.cache.touch(self.key)
+            return self.entry.data
+        if response.status_code != 200:
+            raise self._failed(SpotifyAPIError(f"{self.error}: {response.text}", response.status_code))
+        data = response.json()
+        if self.cache is not None:
+            self.cache.set(self.endpoint, self.key, data, response.headers.get('ETag'))
+        return data
+
+    def _failed(self, error):
+        return _failed('GET', self.endpoint, self.url, self.params, error)
+
+
+def api_get(path, access_token, params=None, error="Request failed", session=None):
+    session = session or get_session()
+    access_token = resolve_token(access_token)
+    url = api_url(path)
+    get = _CachedGet(url, _base_url, path, params, error)
+    if get.hit:
+        return get.entry.data
+
+    scheduler = get_scheduler()
+    request = lambda: session.get(url, headers=_bearer(access_token, get.etag), params=params, timeout=_timeout)
+    response = scheduler.send(observe(request, 'GET', get.endpoint, url, params, get.state), get.endpoint)
+    if get.retry(response, access_token):
+        response = scheduler.send(observe(request, 'GET', get.endpoint, url, params, get.state), get.endpoint)
+    return get.result(response)
+
+
+def _failed(method, endpoint, url, params, error):
+    request_failed(method, endpoint, url, params, error)
+    return error
+
+
+def api_post(data, url=None, error="Request failed", session=None):
+    # The form data holds the client credentials, so it is never passed to hooks
+    session = session or get_session()
+    url = url or _auth_url
+    request = observe(lambda: session.post(url, data, timeout=_timeout), 'POST', '/api/token', url)
+    response = get_scheduler().send(request, '/api/token')
+    if response.status_code != 200:
+        raise _failed('POST', '/api/token', url, None, SpotifyAPIError(f"{error}: {response.text}", response.status_code))
+    return response.json()
+
+
+def follow_pages(page, access_token, limit=None, prefetch=False, error="Request failed"):
+    # Yields the items of a paging object and of every page its `next` links lead to,
+    # stopping after `limit` items. With prefetch=True the next page is requested in the
+    # background while the caller is still consuming the current one.
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    yielded = 0
+    try:
+        while page is not None:
+            items = page.get('items', [])
+            next_url = page.get('next')
+            if limit is not None and yielded + len(items) >= limit:
+                items = items[:limit - yielded]
+                next_url = None
+            future = executor.submit(api_get, next_url, access_token, error=error) if executor is not None and next_url else None
+            for item in items:
+                yield item
+            yielded += len(items)
+            if not next_url:
+                return
+            page = future.result() if future is not None else api_get(next_url, access_token, error=error)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def paginate(path, access_token, params=None, page_size=PAGE_SIZE, limit=None, prefetch=False, error="Request failed"):
+    params = dict(params or {})
+    params['limit'] = min(page_size, limit) if limit else page_size
+    page = api_get(path, access_token, params=params, error=error)
+    return follow_pages(page, access_token, limit=limit, prefetch=prefetch, error=error)